@@ -0,0 +1,95 @@
+"""
+Parity check of chunked conversions against the serial one
+
+Usage: python benchmarks/bench_chunk_parity.py [--chunk-chars 200]
+
+Converts inputs whose related blocks end up in different chunks, such as
+reference-style links far from their definitions and raw HTML blocks
+spanning blank lines, with the streaming and parallel converters at a small
+chunk size. Exits with 1 if either word/document.xml differs from the one
+of a serial conversion.
+"""
+
+import io
+import os
+import sys
+import time
+import zipfile
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from md_to_docx.config import load_config
+from md_to_docx.converter import Converter
+from md_to_docx.parallel import ParallelConverter
+
+
+def _filler(count):
+    """Return count paragraphs of plain text"""
+    return '\n\n'.join(f'Paragraph {i} with some filler text to fill a chunk.' for i in range(count))
+
+
+CASES = {
+    'references': (
+        '\n\n'.join(f'Paragraph {i} links to [the docs][docs] and [Home].' for i in range(40))
+        + '\n\n```\n[docs]: not a definition\n```\n\n'
+        + '[docs]: https://example.com/docs "Docs"\n[home]:\n    https://example.com\n'
+    ),
+    'table references': (
+        '| Name | Link |\n|---|---|\n'
+        + ''.join(f'| row {i} | [docs][docs] |\n' for i in range(60))
+        + '\n' + _filler(10) + '\n\n[docs]: https://example.com/docs\n'
+    ),
+    'raw html': (
+        _filler(8) + '\n\n<div class="note">\n\n' + _filler(8) + '\n\n# Not a heading\n\n'
+        '<div>\n\ninner\n\n</div>\n\nstill inside\n\n</div>\n\n'
+        + _filler(8) + '\n\n<!-- a comment\n\n' + _filler(8) + '\n\n-->\n\n' + _filler(8)
+    ),
+}
+
+
+def document_xml(data):
+    """Return the word/document.xml of DOCX bytes"""
+    with zipfile.ZipFile(io.BytesIO(data)) as docx:
+        return docx.read('word/document.xml')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that chunked conversions match the serial one')
+    parser.add_argument('--chunk-chars', type=int, default=200,
+                        help='Chunk size of the streaming and parallel converters (default: %(default)s)')
+    args = parser.parse_args()
+
+    config = load_config()
+    # Render the table case in batches of rows, as very large tables are
+    config['table']['stream_threshold'] = config['table']['bulk_threshold']
+    converter = Converter(config)
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp, \
+            ParallelConverter(converter, workers=2, chunk_chars=args.chunk_chars) as pool:
+        for label, md_text in CASES.items():
+            expected = document_xml(converter.convert(md_text))
+            path = os.path.join(tmp, 'input.md')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(md_text)
+
+            output = io.BytesIO()
+            start = time.perf_counter()
+            converter.convert_file_streaming(path, output, args.chunk_chars)
+            results = [('stream', output.getvalue(), time.perf_counter() - start)]
+            start = time.perf_counter()
+            results.append(('parallel', pool.convert(md_text), time.perf_counter() - start))
+
+            for mode, data, elapsed in results:
+                status = 'ok'
+                if document_xml(data) != expected:
+                    status = 'differs from serial'
+                    failed = True
+                print(f"{label:<18} {mode:<9} {elapsed * 1000:>8.1f} ms  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Parity check between the parsing engines
+
+Usage: python benchmarks/bench_engine_parity.py [--engines html tree] [--seed 0]
+
+Renders a fixed set of tricky Markdown inputs and a seeded corpus document
+with every engine and compares their word/document.xml. Exits with 1 if
+any engine's output differs from the first one's, printing the first
+differing line.
+"""
+
+import io
+import os
+import sys
+import time
+import zipfile
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import SHAPES, generate_document
+
+from md_to_docx.converter import Converter
+from md_to_docx.engines import ENGINES
+
+
+# Inputs where the engines have to agree on whitespace, nesting and markup
+CASES = {
+    'inline': (
+        "Plain **bold** *italic* ***both*** `code` and ~~tilde~~ text  \n"
+        "after a hard break, with <b>raw bold</b>, <i>raw italic</i>, <u>under</u> "
+        "and <span style=\"color:red\">red <b>bold</b></span> spans.\n\n"
+        "A [link](https://example.com \"title\"), an <https://example.com/auto> link "
+        "and entities &amp; &lt;tag&gt; &copy; \\*escaped\\*.\n"
+    ),
+    'headings': "".join(f"{'#' * level} Heading {level} with `code`\n\n" for level in range(1, 7))
+                + "Setext\n======\n\nSub\n---\n",
+    'lists': (
+        "- one\n- two with **bold**\n    - nested\n        1. deep\n        2. deeper\n- three\n\n"
+        "Text between lists.\n\n"
+        "1. first\n\n   continued paragraph\n\n2. second\n"
+    ),
+    'code': (
+        "```python\ndef f(x):\n    return x  # comment\n\n\n    \tindented\n```\n\n"
+        "~~~\n<b>not html</b> & entities &amp;\n~~~\n\n"
+        "    indented code\n    second line\n"
+    ),
+    'tables': (
+        "| Left | Center | Right |\n|:-----|:------:|------:|\n"
+        "| `a|b` | **x** | <span style=\"color:blue\">blue</span> |\n"
+        "| escaped \\| pipe | | last |\n\n"
+        "a | b\n--- | ---\n1 | 2\n\n"
+        "| Blank | Rows |\n|---|---|\n\n| spread | out |\n\n| over | blanks |\n"
+    ),
+    'blocks': (
+        "> quoted **text**\n>\n> second paragraph\n\n"
+        "---\n\n"
+        "<div>\nraw <b>html</b> block\n</div>\n\n"
+        "<!-- a comment -->\n\n"
+        "Paragraph\nwith soft\nbreaks.\n"
+    ),
+}
+
+
+def document_xml(converter, md_text):
+    """Convert Markdown text and return its word/document.xml"""
+    data = converter.convert(md_text)
+    with zipfile.ZipFile(io.BytesIO(data)) as docx:
+        return docx.read('word/document.xml')
+
+
+def first_difference(expected, actual):
+    """Return the first differing lines of two XML documents, split at tags"""
+    expected_lines = expected.replace(b'><', b'>\n<').splitlines()
+    actual_lines = actual.replace(b'><', b'>\n<').splitlines()
+    for left, right in zip(expected_lines, actual_lines):
+        if left != right:
+            return left, right
+    return (b'<end>', actual_lines[len(expected_lines)]) if len(actual_lines) > len(expected_lines) \
+        else (expected_lines[len(actual_lines)], b'<end>')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that every engine renders identical documents')
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES), default=list(ENGINES),
+                        help='Engines to compare; the first is the reference (default: all)')
+    parser.add_argument('--shape', choices=sorted(SHAPES), default='mixed',
+                        help='Corpus shape of the generated document (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    cases = dict(CASES)
+    cases[f'corpus {args.shape}'] = generate_document(SHAPES[args.shape], args.seed)
+    converters = [Converter(engine=engine) for engine in args.engines]
+    reference = converters[0]
+
+    failed = False
+    for label, md_text in cases.items():
+        expected = document_xml(reference, md_text)
+        for converter in converters[1:]:
+            start = time.perf_counter()
+            actual = document_xml(converter, md_text)
+            elapsed = time.perf_counter() - start
+            status = 'ok'
+            if actual != expected:
+                left, right = first_difference(expected, actual)
+                status = (f"differs from {reference.engine}:\n"
+                          f"    {reference.engine}: {left.decode('utf-8', 'replace')}\n"
+                          f"    {converter.engine}: {right.decode('utf-8', 'replace')}")
+                failed = True
+            print(f"{label:<16} {converter.engine:<6} {elapsed * 1000:>8.1f} ms  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
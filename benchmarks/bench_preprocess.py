@@ -0,0 +1,104 @@
+"""
+Benchmark the table preprocessor on large table-heavy inputs
+
+Usage: python benchmarks/bench_preprocess.py [--sizes-mb 100 200] [--keep]
+
+For each size a file of blank-line-separated tables is generated, then
+three variants run in fresh processes: the previous list-based
+implementation on the whole text, fix_markdown_tables() on the whole text,
+and iter_fixed_table_lines() streaming over the open file. Reports
+throughput and peak RSS for each.
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import SHAPES, generate_document
+from benchmarks.run import _peak_rss
+
+
+def legacy_fix_markdown_tables(content):
+    """The list-based implementation fix_markdown_tables replaced, for comparison"""
+    lines = content.split('\n')
+    result = []
+    in_table = False
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if '|' in stripped and stripped.count('|') >= 2:
+            if i > 0 and in_table and not result[-1].strip():
+                result.pop()
+            in_table = True
+            result.append(line)
+        else:
+            if stripped:
+                in_table = False
+            result.append(line)
+    return '\n'.join(result)
+
+
+def write_input(path, size_mb, seed=0):
+    """Write blank-line-separated tables to path until it reaches size_mb"""
+    target = size_mb * 1e6
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < target:
+            chunk = generate_document(SHAPES['blank_tables'], seed)
+            f.write(chunk)
+            f.write('\n')
+            written += len(chunk) + 1
+            seed += 1
+
+
+def run_variant(variant, path):
+    """Run one preprocessing variant and return (seconds, output characters, peak RSS)"""
+    from md_to_docx.utils import fix_markdown_tables, iter_fixed_table_lines
+
+    start = time.perf_counter()
+    if variant == 'streaming':
+        size = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in iter_fixed_table_lines(f):
+                size += len(line)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        fix = legacy_fix_markdown_tables if variant == 'legacy' else fix_markdown_tables
+        size = len(fix(content))
+    return time.perf_counter() - start, size, _peak_rss()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark fix_markdown_tables on large inputs')
+    parser.add_argument('--sizes-mb', type=int, nargs='+', default=[100, 200])
+    parser.add_argument('--keep', action='store_true', help='Keep the generated input files')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    print(f"{'MB':>6} {'variant':<10} {'seconds':>9} {'MB/s':>8} {'peak RSS MB':>12}")
+    for size_mb in args.sizes_mb:
+        fd, path = tempfile.mkstemp(suffix='.md')
+        os.close(fd)
+        try:
+            write_input(path, size_mb)
+            actual_mb = os.path.getsize(path) / 1e6
+            for variant in ('legacy', 'string', 'streaming'):
+                with context.Pool(1) as pool:
+                    seconds, _, rss = pool.apply(run_variant, (variant, path))
+                rss_text = f"{rss / 1e6:.0f}" if rss is not None else '-'
+                print(f"{actual_mb:>6.0f} {variant:<10} {seconds:>9.2f} "
+                      f"{actual_mb / seconds:>8.1f} {rss_text:>12}")
+        finally:
+            if args.keep:
+                print(f"Kept {path}")
+            else:
+                os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
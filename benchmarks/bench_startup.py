@@ -0,0 +1,75 @@
+"""
+Startup regression check for the command line
+
+Usage: python benchmarks/bench_startup.py [--budget-ms 60] [--runs 5]
+
+Runs md-to-docx.py under `python -X importtime` for --help and for a
+missing input file. Exits with 1 if either path imports a heavy dependency
+(markdown, docx, lxml, bs4) or if its best total import time exceeds the
+budget.
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+import tempfile
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, 'md-to-docx.py')
+
+HEAVY_MODULES = ('markdown', 'docx', 'lxml', 'bs4')
+
+
+def import_times(args):
+    """Run the CLI with -X importtime and return {module: cumulative microseconds}"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', SCRIPT] + args,
+        capture_output=True, text=True, cwd=tempfile.gettempdir(), stdin=subprocess.DEVNULL
+    )
+    times = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Top-level imports are indented by a single space
+        if not name[1:].startswith(' '):
+            total += int(cumulative)
+        times[name.strip()] = int(cumulative)
+    return times, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check CLI startup imports and time')
+    parser.add_argument('--budget-ms', type=float, default=60.0,
+                        help='Maximum total import time per path (default: %(default)s)')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per path; the best is kept')
+    args = parser.parse_args()
+
+    paths = {
+        '--help': ['--help'],
+        'missing input': [os.path.join(tempfile.gettempdir(), 'md-to-docx-missing-input.md')],
+    }
+    failed = False
+    for label, cli_args in paths.items():
+        best = None
+        for _ in range(args.runs):
+            times, total = import_times(cli_args)
+            best = total if best is None else min(best, total)
+        heavy = sorted(name for name in times if name.split('.')[0] in HEAVY_MODULES)
+        status = 'ok'
+        if heavy:
+            status = f"imports {', '.join(heavy[:5])}"
+            failed = True
+        elif best / 1000 > args.budget_ms:
+            status = f"over budget ({args.budget_ms:.0f} ms)"
+            failed = True
+        print(f"{label:<14} {best / 1000:>8.1f} ms  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Benchmark table rendering: per-cell python-docx path versus the bulk builder
+
+Usage: python benchmarks/bench_tables.py [--sizes 1000 10000 50000] [--cols 5]
+
+The per-cell path is quadratic in the row count, so it is only timed up to
+--legacy-max-rows rows.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx.shared import RGBColor
+
+from md_to_docx.config import load_config, compile_config
+from md_to_docx.converter import Converter
+from md_to_docx.inline import PLAIN
+from md_to_docx.renderer import render_table
+
+
+def make_rows(row_count, col_count):
+    """Build a table payload with a header row and colored span cells"""
+    red = PLAIN._replace(color=RGBColor(0xFF, 0x00, 0x00))
+    rows = [[("th", [(f"Column {c}", PLAIN)]) for c in range(col_count)]]
+    for r in range(row_count):
+        cells = []
+        for c in range(col_count):
+            if c == 1 and r % 3 == 0:
+                cells.append(("td", [(f"status {r}", red)]))
+            else:
+                cells.append(("td", [(f"cell {r}.{c}", PLAIN)]))
+        rows.append(cells)
+    return rows
+
+
+def time_render(rows, config):
+    """Return the seconds taken to render rows into a fresh document"""
+    compiled = compile_config(config)
+    doc = Converter(config).new_document()
+    start = time.perf_counter()
+    render_table(doc, "table", rows, compiled)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark table rendering paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--cols', type=int, default=5)
+    parser.add_argument('--legacy-max-rows', type=int, default=200,
+                        help='Skip the per-cell path above this many rows (it is quadratic)')
+    args = parser.parse_args()
+
+    config = load_config()
+    legacy_config = dict(config, table=dict(config.get('table', {}), bulk_threshold=max(args.sizes) + 2))
+    bulk_config = dict(config, table=dict(config.get('table', {}), bulk_threshold=0))
+
+    print(f"{'rows':>8} {'per-cell (s)':>14} {'bulk (s)':>10} {'speedup':>9}")
+    for size in args.sizes:
+        rows = make_rows(size, args.cols)
+        bulk = time_render(rows, bulk_config)
+        if size <= args.legacy_max_rows:
+            legacy = time_render(rows, legacy_config)
+            print(f"{size:>8} {legacy:>14.3f} {bulk:>10.3f} {legacy / bulk:>8.1f}x")
+        else:
+            print(f"{size:>8} {'skipped':>14} {bulk:>10.3f} {'-':>9}")
+
+
+if __name__ == '__main__':
+    main()
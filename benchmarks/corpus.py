@@ -0,0 +1,159 @@
+"""
+Seeded synthetic Markdown corpus for benchmarks
+
+generate_document() builds a document from a Shape. The same shape and seed
+always produce the same text, so runs on different commits are comparable.
+"""
+
+import random
+from dataclasses import dataclass, replace
+
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam "
+    "quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo "
+    "consequat duis aute irure in reprehenderit voluptate velit esse cillum"
+).split()
+
+SPAN_COLORS = ['red', 'green', 'blue', 'orange', 'gray', '#2E75B6', '#C00000']
+
+CODE_LINES = [
+    "def handler(request):",
+    "    value = request.get('value', 0)",
+    "    if value > 10:",
+    "        return {'status': 'large', 'value': value}",
+    "    for item in range(value):",
+    "        log.debug('item %s', item)",
+    "    return None",
+]
+
+
+@dataclass(frozen=True)
+class Shape:
+    """Number and size of each kind of block in a generated document"""
+    paragraphs: int = 0
+    sentences: int = 4
+    heading_depth: int = 0
+    heading_fanout: int = 2
+    code_blocks: int = 0
+    code_lines: int = 20
+    tables: int = 0
+    table_rows: int = 10
+    table_cols: int = 4
+    span_ratio: float = 0.0
+    blank_line_tables: bool = False
+    lists: int = 0
+    list_items: int = 5
+
+
+SHAPES = {
+    'prose': Shape(paragraphs=2000, sentences=5, lists=100),
+    'headings': Shape(paragraphs=200, heading_depth=6, heading_fanout=3),
+    'code': Shape(paragraphs=20, code_blocks=20, code_lines=2000),
+    'wide_tables': Shape(tables=20, table_rows=50, table_cols=30, span_ratio=0.2),
+    'tall_tables': Shape(tables=2, table_rows=20000, table_cols=5, span_ratio=0.1),
+    'blank_tables': Shape(tables=200, table_rows=30, table_cols=5, span_ratio=0.1,
+                          blank_line_tables=True),
+    'mixed': Shape(paragraphs=500, heading_depth=3, code_blocks=20, code_lines=50,
+                   tables=20, table_rows=100, table_cols=6, span_ratio=0.1, lists=50),
+}
+
+
+def scale_shape(shape, factor):
+    """Return shape with every block count multiplied by factor (at least 1 if nonzero)"""
+    def scaled(count):
+        return max(1, round(count * factor)) if count else 0
+    return replace(
+        shape,
+        paragraphs=scaled(shape.paragraphs),
+        code_blocks=scaled(shape.code_blocks),
+        tables=scaled(shape.tables),
+        lists=scaled(shape.lists),
+    )
+
+
+def _sentence(rng):
+    """Return a random sentence, sometimes with inline markup"""
+    words = rng.choices(WORDS, k=rng.randint(6, 14))
+    i = rng.randrange(len(words))
+    markup = rng.random()
+    if markup < 0.15:
+        words[i] = f"**{words[i]}**"
+    elif markup < 0.3:
+        words[i] = f"*{words[i]}*"
+    elif markup < 0.4:
+        words[i] = f"`{words[i]}`"
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng, shape):
+    """Return a paragraph of shape.sentences sentences"""
+    return " ".join(_sentence(rng) for _ in range(shape.sentences))
+
+
+def _code_block(rng, shape):
+    """Return a fenced code block of shape.code_lines lines"""
+    start = rng.randrange(len(CODE_LINES))
+    lines = [CODE_LINES[(start + i) % len(CODE_LINES)] for i in range(shape.code_lines)]
+    return "```python\n" + "\n".join(lines) + "\n```"
+
+
+def _cell(rng, shape):
+    """Return a table cell, colored with a <span> for shape.span_ratio of them"""
+    text = " ".join(rng.choices(WORDS, k=rng.randint(1, 3)))
+    if shape.span_ratio and rng.random() < shape.span_ratio:
+        return f'<span style="color:{rng.choice(SPAN_COLORS)}">{text}</span>'
+    return text
+
+
+def _table(rng, shape):
+    """Return a pipe table, with blank lines between rows if shape asks for it"""
+    cols = shape.table_cols
+    lines = [
+        "| " + " | ".join(f"Column {c}" for c in range(cols)) + " |",
+        "|" + "|".join("---" for _ in range(cols)) + "|",
+    ]
+    for _ in range(shape.table_rows):
+        lines.append("| " + " | ".join(_cell(rng, shape) for _ in range(cols)) + " |")
+    separator = "\n\n" if shape.blank_line_tables else "\n"
+    return separator.join(lines)
+
+
+def _list(rng, shape):
+    """Return a bullet or numbered list"""
+    ordered = rng.random() < 0.5
+    return "\n".join(
+        f"{i + 1}. {_sentence(rng)}" if ordered else f"- {_sentence(rng)}"
+        for i in range(shape.list_items)
+    )
+
+
+def _heading_tree(rng, shape, level, blocks):
+    """Append a heading tree of shape.heading_depth levels to blocks"""
+    for n in range(shape.heading_fanout):
+        blocks.append(f"{'#' * level} Heading {level}.{n} {rng.choice(WORDS)}")
+        blocks.append(_sentence(rng))
+        if level < shape.heading_depth:
+            _heading_tree(rng, shape, level + 1, blocks)
+
+
+def generate_document(shape, seed=0):
+    """Return a Markdown document of the given Shape, deterministic per seed"""
+    rng = random.Random(seed)
+    blocks = []
+    if shape.heading_depth:
+        _heading_tree(rng, shape, 1, blocks)
+
+    kinds = (
+        ['p'] * shape.paragraphs
+        + ['pre'] * shape.code_blocks
+        + ['table'] * shape.tables
+        + ['list'] * shape.lists
+    )
+    rng.shuffle(kinds)
+    makers = {'p': _paragraph, 'pre': _code_block, 'table': _table, 'list': _list}
+    for kind in kinds:
+        blocks.append(makers[kind](rng, shape))
+
+    return "\n\n".join(blocks) + "\n"
@@ -0,0 +1,159 @@
+"""
+Benchmark end-to-end conversion on the synthetic corpus
+
+Usage: python benchmarks/run.py [--shapes mixed prose ...] [--iterations 3]
+                                [--scale 1.0] [--engine html]
+                                [--baseline benchmarks/baseline.json]
+                                [--save-baseline] [--tolerance 10]
+
+Each shape runs in a fresh process so its peak RSS is not inflated by the
+shapes before it. Reports docs/s, MB/s, mean per-stage latency and peak RSS,
+and compares them against the baseline file when it exists. Exits with 1 if
+throughput drops or peak RSS grows by more than --tolerance percent.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import SHAPES, generate_document, scale_shape
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def _peak_rss():
+    """Return this process's peak resident set size in bytes, or None if unknown"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_shape(name, scale, seed, iterations, engine):
+    """Convert one generated document repeatedly and return its measurements"""
+    from md_to_docx import Converter, Profiler
+
+    text = generate_document(scale_shape(SHAPES[name], scale), seed)
+    size = len(text.encode('utf-8'))
+    profiler = Profiler(trace_memory=False)
+    converter = Converter(engine=engine, profiler=profiler)
+    # Warm the template and parser caches outside the timed runs
+    Converter(engine=engine).convert(text[:4096])
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        converter.convert(text)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'input_bytes': size,
+        'iterations': iterations,
+        'seconds': elapsed,
+        'docs_per_second': iterations / elapsed,
+        'mb_per_second': size * iterations / elapsed / 1e6,
+        'stages': {stage: record['seconds'] / iterations
+                   for stage, record in profiler.stages.items()},
+        'peak_rss': _peak_rss(),
+    }
+
+
+def _change(current, previous):
+    """Return the relative change in percent, or None if it cannot be computed"""
+    if current is None or not previous:
+        return None
+    return (current - previous) / previous * 100
+
+
+def compare(results, baseline, tolerance):
+    """Print changes against baseline results and return the regressed shapes"""
+    regressions = []
+    print(f"\n{'shape':<14} {'docs/s':>10} {'peak RSS':>10}   vs baseline")
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<14} {'-':>10} {'-':>10}   (not in baseline)")
+            continue
+        speed = _change(result['docs_per_second'], previous['docs_per_second'])
+        rss = _change(result['peak_rss'], previous.get('peak_rss'))
+        speed_text = f"{speed:+.1f}%" if speed is not None else '-'
+        rss_text = f"{rss:+.1f}%" if rss is not None else '-'
+        print(f"{name:<14} {speed_text:>10} {rss_text:>10}")
+        if speed is not None and speed < -tolerance:
+            regressions.append(name)
+        elif rss is not None and rss > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark conversion on a synthetic corpus')
+    parser.add_argument('--shapes', nargs='+', choices=sorted(SHAPES), default=sorted(SHAPES))
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply the block counts of every shape (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', default='html')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='Baseline results to compare against (default: %(default)s)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Write these results to --baseline instead of comparing')
+    parser.add_argument('--tolerance', type=float, default=10.0,
+                        help='Allowed regression in percent before exiting with 1 (default: %(default)s)')
+    parser.add_argument('--json', help='Also write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    print(f"{'shape':<14} {'MB':>8} {'docs/s':>9} {'MB/s':>8} {'peak RSS MB':>12}  stages (ms)")
+    for name in args.shapes:
+        with context.Pool(1) as pool:
+            result = pool.apply(run_shape, (name, args.scale, args.seed, args.iterations, args.engine))
+        results[name] = result
+        stages = ' '.join(f"{stage}={seconds * 1000:.1f}" for stage, seconds in result['stages'].items())
+        rss = f"{result['peak_rss'] / 1e6:.1f}" if result['peak_rss'] is not None else '-'
+        print(f"{name:<14} {result['input_bytes'] / 1e6:>8.2f} {result['docs_per_second']:>9.2f} "
+              f"{result['mb_per_second']:>8.2f} {rss:>12}  {stages}")
+
+    report = {
+        'engine': args.engine,
+        'scale': args.scale,
+        'seed': args.seed,
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if (baseline.get('engine'), baseline.get('scale'), baseline.get('seed')) != \
+            (args.engine, args.scale, args.seed):
+        print("\nWarning: baseline was recorded with a different engine, scale or seed")
+    regressions = compare(results, baseline.get('results', {}), args.tolerance)
+    if regressions:
+        print(f"\nRegressed beyond {args.tolerance}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
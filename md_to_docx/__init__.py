@@ -1,5 +1,35 @@
 """
 md-to-docx: Convert Markdown files to formatted Word documents
+
+The public API is imported lazily on first attribute access, so importing
+the package (as the command line does) stays cheap.
 """
 
+import importlib
+
 __version__ = "1.0.0"
+
+# Exported name -> submodule defining it
+_EXPORTS = {
+    'ConfigError': 'config',
+    'compile_config': 'config',
+    'load_compiled_config': 'config',
+    'Converter': 'converter',
+    'convert': 'converter',
+    'run_batch': 'batch',
+    'ParallelConverter': 'parallel',
+    'BookBuilder': 'book',
+    'OutputCache': 'cache',
+    'Profiler': 'profiling',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
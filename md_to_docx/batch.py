@@ -0,0 +1,193 @@
+"""
+Batch conversion of many Markdown files over a process pool
+"""
+
+import os
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .config import compile_config, load_compiled_config
+from .converter import Converter
+from .engines import DEFAULT_ENGINE
+from .output import zip_compression
+from .utils import atomic_write_bytes
+
+
+_GLOB_CHARS = ('*', '?', '[')
+
+# Converter, compression and output cache owned by each worker process, set
+# once by _init_worker
+_worker_converter = None
+_worker_compression = None
+_worker_cache = None
+
+
+def _glob_root(pattern):
+    """Return the directory prefix of a glob pattern that contains no wildcards"""
+    parts = []
+    for part in pattern.replace('\\', '/').split('/'):
+        if any(ch in part for ch in _GLOB_CHARS):
+            break
+        parts.append(part)
+    return '/'.join(parts) or '.'
+
+
+def collect_inputs(sources):
+    """Expand files, directories and glob patterns into (input_md, relative_docx) pairs
+
+    Outputs are relative to the directory or the fixed prefix of the glob
+    pattern they were found in, and single files are named after their
+    basename. With several such roots, each root's outputs are placed in a
+    folder named after it, so the same name in two roots maps to two files.
+    """
+    seen = set()
+    pairs = []
+    roots = {os.path.normpath(source if os.path.isdir(source) else _glob_root(source))
+             for source in sources
+             if os.path.isdir(source) or any(ch in source for ch in _GLOB_CHARS)}
+
+    def add(path, root):
+        path = os.path.normpath(path)
+        if path in seen:
+            return
+        seen.add(path)
+        if root is None:
+            relative = os.path.basename(path)
+        else:
+            relative = os.path.relpath(path, root)
+            if len(roots) > 1:
+                relative = os.path.join(os.path.basename(os.path.abspath(root)), relative)
+        pairs.append((path, os.path.splitext(relative)[0] + '.docx'))
+
+    for source in sources:
+        if os.path.isdir(source):
+            for dirpath, dirnames, filenames in os.walk(source):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if filename.lower().endswith('.md'):
+                        add(os.path.join(dirpath, filename), source)
+        elif any(ch in source for ch in _GLOB_CHARS):
+            root = _glob_root(source)
+            for path in sorted(glob.glob(source, recursive=True)):
+                if os.path.isfile(path):
+                    add(path, root)
+        else:
+            add(source, None)
+
+    return pairs
+
+
+def _init_worker(config, engine, template, compression=None, cache=None):
+    """Create the per-process converter so config and template load once per worker"""
+    global _worker_converter, _worker_compression, _worker_cache
+    _worker_converter = Converter(config, engine, template)
+    _worker_compression = compression
+    _worker_cache = cache
+    # Warm the template cache before the first file arrives
+    _worker_converter.new_document()
+
+
+def _convert_one(input_md, output_docx):
+    """Convert one file inside a worker, returning (error message or None, served from cache)"""
+    converter = _worker_converter
+    cache = _worker_cache
+    try:
+        base_dir = os.path.dirname(os.path.abspath(input_md))
+        if cache is not None:
+            key = cache.key(input_md, converter.config, converter.engine, converter.template,
+                            _worker_compression)
+            os.makedirs(os.path.dirname(os.path.abspath(output_docx)), exist_ok=True)
+            if cache.fetch(key, output_docx, base_dir):
+                return None, True
+            converter.image_files = {}
+        with open(input_md, "r", encoding="utf-8") as f:
+            md_content = f.read()
+        data = converter.convert(md_content, _worker_compression, base_dir)
+        atomic_write_bytes(output_docx, data)
+        if cache is not None:
+            cache.store(key, data, base_dir, converter.image_files)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}", False
+    return None, False
+
+
+def _split_duplicate_outputs(jobs):
+    """Return (jobs, failures), moving jobs that share an output path to failures"""
+    inputs = {}
+    for input_md, output_docx in jobs:
+        key = os.path.normcase(os.path.abspath(output_docx))
+        inputs.setdefault(key, []).append(input_md)
+    unique = []
+    failures = []
+    for input_md, output_docx in jobs:
+        same = inputs[os.path.normcase(os.path.abspath(output_docx))]
+        if len(same) == 1:
+            unique.append((input_md, output_docx))
+            continue
+        others = ', '.join(other for other in same if other != input_md)
+        failures.append({'input': input_md, 'output': output_docx,
+                         'error': f"duplicate output path, also written from {others}"})
+    return unique, failures
+
+
+def run_batch(sources, output_dir=None, workers=None, config=None, engine=DEFAULT_ENGINE,
+              template=None, compression=None, cache=None):
+    """Convert all Markdown files matched by sources in parallel
+
+    Outputs are written atomically and existing files are overwritten without
+    prompting. Per-file failures are collected in the returned summary rather
+    than aborting the run. Inputs that would write the same output file,
+    such as a.md given as a file from two directories, all fail without
+    converting. With a cache.OutputCache, files converted before are served
+    from it and new conversions are stored in it.
+    """
+    start = time.perf_counter()
+
+    # Validate the config up front so a bad file fails fast instead of
+    # breaking every worker's initializer
+    if config is None:
+        load_compiled_config()
+    else:
+        compile_config(config)
+    zip_compression(compression)
+
+    jobs = []
+    for input_md, relative_docx in collect_inputs(sources):
+        if output_dir:
+            output_docx = os.path.join(output_dir, relative_docx)
+        else:
+            output_docx = os.path.splitext(input_md)[0] + '.docx'
+        jobs.append((input_md, output_docx))
+
+    succeeded = []
+    failed = []
+    jobs, duplicates = _split_duplicate_outputs(jobs)
+    failed.extend(duplicates)
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(config, engine, template, compression, cache)) as executor:
+            futures = {
+                executor.submit(_convert_one, input_md, output_docx): (input_md, output_docx)
+                for input_md, output_docx in jobs
+            }
+            for future in as_completed(futures):
+                input_md, output_docx = futures[future]
+                try:
+                    error, cached = future.result()
+                except Exception as e:
+                    # The worker process itself died
+                    error = f"{type(e).__name__}: {e}"
+                if error is None:
+                    succeeded.append({'input': input_md, 'output': output_docx, 'cached': cached})
+                else:
+                    failed.append({'input': input_md, 'output': output_docx, 'error': error})
+
+    succeeded.sort(key=lambda item: item['input'])
+    failed.sort(key=lambda item: item['input'])
+    return {
+        'total': len(succeeded) + len(failed),
+        'succeeded': succeeded,
+        'failed': failed,
+        'elapsed': time.perf_counter() - start,
+    }
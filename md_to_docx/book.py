@@ -0,0 +1,237 @@
+"""
+Book mode: one DOCX from an ordered manifest of chapter files
+
+Each chapter is rendered on its own, in parallel worker processes, and the
+body fragments are stitched together with a next-page section break between
+chapters, so no merged Markdown text or tree is ever built. Rendered
+chapters are cached on disk under a hash of their content and the
+effective settings, so a rebuild only renders the chapters that changed
+or whose image files changed. Relative image paths resolve against each
+chapter's directory.
+
+Numbered lists take their numbering from the shared list style rather than
+per-list definitions, so numbering continues across chapters as it would
+in a single document. Reference-style link definitions apply within their
+own chapter.
+"""
+
+import os
+import copy
+import json
+import hashlib
+
+from docx.enum.section import WD_SECTION
+
+from . import __version__
+from .converter import Converter
+from .defaults import BOOK_CACHE_DIR
+from .incremental import settings_key
+from .images import files_changed
+from .parallel import ParallelConverter, merge_fragments
+from . import parallel
+from .profiling import stage
+from .streaming import body_xml, fragment_rels
+from .utils import atomic_write_bytes
+
+
+_CACHE_SUFFIX = '.chapter'
+
+
+def _encode_chapter(result):
+    """Return the cache file bytes of a chapter's (fragment, rels, files)
+
+    A JSON header line describes the entry and gives the lengths of the
+    fragment and of each relationship's blob, which follow it as raw bytes.
+    """
+    fragment, rels, files = result
+    header = {
+        'fragment': len(fragment),
+        'rels': [[rId, reltype, is_external, target_ref, content_type, None if blob is None else len(blob)]
+                 for rId, reltype, is_external, target_ref, content_type, blob in rels],
+        'files': sorted(files.items()),
+    }
+    blobs = [blob for *_, blob in rels if blob is not None]
+    return b''.join([json.dumps(header).encode('utf-8'), b'\n', fragment] + blobs)
+
+
+def _decode_chapter(data):
+    """Return the (fragment, rels, files) of cache file bytes, raising ValueError if they are malformed"""
+    end = data.index(b'\n')
+    header = json.loads(data[:end])
+    offset = end + 1
+
+    def take(length):
+        nonlocal offset
+        if not isinstance(length, int) or length < 0 or offset + length > len(data):
+            raise ValueError('truncated chapter cache entry')
+        offset += length
+        return data[offset - length:offset]
+
+    fragment = take(header['fragment'])
+    rels = []
+    for rId, reltype, is_external, target_ref, content_type, length in header['rels']:
+        blob = None if length is None else take(length)
+        rels.append((rId, reltype, is_external, target_ref, content_type, blob))
+    if offset != len(data):
+        raise ValueError('trailing data in chapter cache entry')
+    # file_key() values are tuples, or None for missing files
+    files = {path: None if key is None else tuple(key) for path, key in header['files']}
+    return fragment, rels, files
+
+
+def _render_chapter(md_text, base_dir):
+    """Render one chapter in a parallel worker and return (fragment, rels, files)"""
+    converter = parallel._worker_converter
+    doc = converter.new_document()
+    files = converter.render_into(doc, md_text, base_dir)
+    fragment = body_xml(doc)
+    return fragment, fragment_rels(doc, fragment, parallel._worker_base_rids), files
+
+
+def read_manifest(path):
+    """Return the chapter paths listed in a manifest file
+
+    The manifest lists one Markdown file per line in book order; blank
+    lines and lines starting with '#' are ignored. Relative paths are
+    resolved against the manifest's directory.
+    """
+    root = os.path.dirname(os.path.abspath(path))
+    chapters = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            chapters.append(os.path.normpath(os.path.join(root, line)))
+    return chapters
+
+
+class BookBuilder:
+    """Build one document from many chapter files, re-rendering only changed chapters"""
+
+    def __init__(self, converter=None, workers=None, cache_dir=None):
+        if converter is None:
+            converter = Converter()
+        self.converter = converter
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.rendered = 0
+        self.reused = 0
+
+    def _chapter_key(self, settings, base_dir, data):
+        """Return the hex cache key of a chapter's bytes rendered with the given settings"""
+        digest = hashlib.blake2b(settings, digest_size=16)
+        # Chapters in different directories may resolve images differently
+        digest.update(base_dir.encode('utf-8') + b'\0')
+        digest.update(data)
+        return digest.hexdigest()
+
+    def _load(self, key):
+        """Return the cached (fragment, rels, files) of a chapter, or None"""
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, key + _CACHE_SUFFIX), 'rb') as f:
+                result = _decode_chapter(f.read())
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing or unreadable entries are simply rendered again
+            return None
+        if files_changed(result[2]):
+            return None
+        return result
+
+    def _store(self, key, result):
+        """Cache the (fragment, rels, files) of a chapter"""
+        if self.cache_dir is not None:
+            atomic_write_bytes(os.path.join(self.cache_dir, key + _CACHE_SUFFIX),
+                               _encode_chapter(result))
+
+    def _prune(self, keep):
+        """Remove cache entries of chapters that are no longer part of the book"""
+        if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(_CACHE_SUFFIX) and name[:-len(_CACHE_SUFFIX)] not in keep:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def _section_break(self):
+        """Return the body XML of a paragraph ending a chapter's section"""
+        doc = self.converter.new_document()
+        sectPr = copy.deepcopy(doc.element.body.sectPr)
+        # Chapters share the page setup, headers and footers of the template
+        sectPr.start_type = WD_SECTION.NEW_PAGE
+        paragraph = doc.add_paragraph()
+        paragraph._p.get_or_add_pPr().append(sectPr)
+        return body_xml(doc)
+
+    def render(self, chapters):
+        """Return the (fragment, rels) of each chapter path, rendering only uncached chapters"""
+        converter = self.converter
+        # The version is part of the key so upgrades never reuse stale fragments
+        settings = __version__.encode('utf-8') + settings_key(converter)
+
+        keys = []
+        texts = {}
+        with stage(converter.profiler, 'read'):
+            for path in chapters:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                base_dir = os.path.dirname(os.path.abspath(path))
+                key = self._chapter_key(settings, base_dir, data)
+                keys.append(key)
+                if key not in texts:
+                    texts[key] = (data, base_dir)
+
+        results = {}
+        missing = []
+        for key in texts:
+            result = self._load(key)
+            if result is None:
+                missing.append(key)
+            else:
+                results[key] = result
+
+        if missing:
+            with stage(converter.profiler, 'render'):
+                with ParallelConverter(converter, self.workers) as pool:
+                    markdown = [texts[key][0].decode('utf-8') for key in missing]
+                    base_dirs = [texts[key][1] for key in missing]
+                    for key, result in zip(missing, pool.map(_render_chapter, markdown, base_dirs)):
+                        results[key] = result
+                        self._store(key, result)
+
+        if converter.image_files is not None:
+            for result in results.values():
+                converter.image_files.update(result[2])
+        self.rendered += len(missing)
+        self.reused += len(texts) - len(missing)
+        self._prune(texts)
+        return [results[key][:2] for key in keys]
+
+    def build_document(self, chapters):
+        """Build a python-docx Document from chapter paths in book order"""
+        converter = self.converter
+        if converter.profiler is not None:
+            converter.profiler.conversions += 1
+        results = self.render(chapters)
+        section_break = (self._section_break(), [])
+        stitched = []
+        for index, result in enumerate(results):
+            if index:
+                stitched.append(section_break)
+            stitched.append(result)
+        doc = converter.new_document()
+        return merge_fragments(doc, stitched)
+
+    def convert(self, chapters, output, compression=None):
+        """Build the book from chapter paths and save it to a path or binary stream"""
+        self.converter.save(self.build_document(chapters), output, compression)
+
+    def convert_manifest(self, manifest, output, compression=None):
+        """Build the book listed in a manifest file, caching next to it by default"""
+        if self.cache_dir is None:
+            self.cache_dir = os.path.join(os.path.dirname(os.path.abspath(manifest)), BOOK_CACHE_DIR)
+        self.convert(read_manifest(manifest), output, compression)
@@ -0,0 +1,390 @@
+"""
+Content-addressed cache of converted documents
+
+Conversions are keyed by a hash of the input bytes, the effective config,
+the package and dependency versions and the conversion options, so a CI
+pipeline converting unchanged Markdown again copies (or hard-links) the
+stored DOCX instead of converting it. Looking up and serving an entry
+imports neither markdown, bs4 nor python-docx.
+
+A cache directory holds:
+
+- <key>.json: the entry, naming its document and the image files the
+  conversion read, relative to the input's directory and with a hash of
+  their content, so the entry is only served while they are unchanged,
+  even in a fresh checkout
+- <digest>.docx: a document, named after a hash of its bytes
+- hits, misses, evictions: statistics, one byte appended per event, which
+  stats() folds into hits.count, misses.count and evictions.count by way
+  of briefly kept .pending files
+
+Files are written atomically and documents are never modified, so
+processes sharing a directory need no locking: a reader sees either a
+complete entry or none, and racing writers of one key store equal entries.
+Once the directory exceeds its size limit the least recently used entries
+are evicted; an entry's modification time records its last use.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import functools
+
+from . import __version__
+from .defaults import DEFAULT_CACHE_SIZE_MB, load_config
+from .engines import DEFAULT_ENGINE
+from .utils import atomic_write_bytes, temp_file_beside
+
+
+# Distributions whose installed versions are part of every key
+DEPENDENCIES = ('markdown', 'python-docx', 'beautifulsoup4', 'lxml', 'pygments')
+
+_ENTRY_SUFFIX = '.json'
+_DOCUMENT_SUFFIX = '.docx'
+_STATS = ('hits', 'misses', 'evictions')
+_COUNT_SUFFIX = '.count'
+_PENDING_SUFFIX = '.pending'
+# Time after which no append can still reach a renamed events file
+_FOLD_DELAY_NS = 2 * 10**9
+
+_NAME_SEPARATOR_RE = re.compile(r'[-_.]+')
+
+
+def _normalize(name):
+    """Return a distribution name normalized for comparison"""
+    return _NAME_SEPARATOR_RE.sub('_', name).lower()
+
+
+@functools.lru_cache(maxsize=None)
+def dependency_versions():
+    """Return {distribution: version or None} for DEPENDENCIES
+
+    Versions are read from the names of the installed metadata directories
+    on sys.path, in import order, which avoids the import cost of
+    importlib.metadata. They cannot change within a process, so the
+    result is computed once and shared; do not modify it.
+    """
+    wanted = {_normalize(name): name for name in DEPENDENCIES}
+    versions = dict.fromkeys(DEPENDENCIES)
+    for entry in sys.path:
+        try:
+            filenames = os.listdir(entry or '.')
+        except OSError:
+            continue
+        for filename in filenames:
+            stem, ext = os.path.splitext(filename)
+            if ext not in ('.dist-info', '.egg-info'):
+                continue
+            name, _, version = stem.partition('-')
+            name = wanted.get(_normalize(name))
+            if name is not None and versions[name] is None:
+                versions[name] = version
+    return versions
+
+
+def file_digest(path):
+    """Return the hex BLAKE2b digest of a file's content, or None if it cannot be read"""
+    digest = hashlib.blake2b(digest_size=20)
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def cache_key(data, config=None, **options):
+    """Return the hex key of converting input bytes with a config and options
+
+    config is the raw config dict, or None for load_config(). options are
+    the JSON-serializable conversion settings that affect the output, such
+    as the engine, the template's file_digest() and the compression; see
+    OutputCache.key().
+    """
+    if config is None:
+        config = load_config()
+    settings = json.dumps([__version__, dependency_versions(), config, options],
+                          sort_keys=True, default=str)
+    digest = hashlib.blake2b(settings.encode('utf-8'), digest_size=20)
+    digest.update(b'\0')
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def _remove(path):
+    """Remove a file, ignoring one that is already gone or cannot be removed"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _documents_size(entries):
+    """Return the total size of the documents of _entries(), counting shared ones once"""
+    return sum({document: size for _, _, document, size in entries}.values())
+
+
+class OutputCache:
+    """On-disk cache of converted documents shared by processes
+
+    max_size is the size limit in bytes. With link, hits are hard-linked to
+    the output instead of copied where the file system allows it; outputs
+    then share the cached file, so they must not be modified in place.
+    hits, misses and evictions count the events of this instance; stats()
+    returns those of every process using the directory.
+
+    The directory's size, counting each document once however many entries
+    share it, is scanned once and then tracked as this instance stores
+    documents, so entries are only listed again once the tracked size
+    exceeds the limit. Documents stored by other processes are counted at
+    the next scan.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_CACHE_SIZE_MB << 20, link=False):
+        self.directory = directory
+        self.max_size = max_size
+        self.link = link
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Tracked size of the stored documents, None until first scanned
+        self._size = None
+
+    def _path(self, name):
+        """Return the path of a file in the cache directory"""
+        return os.path.join(self.directory, name)
+
+    def _count(self, stat, n=1):
+        """Add n events to a statistic of this instance and of the directory"""
+        setattr(self, stat, getattr(self, stat) + n)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Appends of a few bytes are atomic, so concurrent counts are never lost
+            with open(self._path(stat), 'ab') as f:
+                f.write(b'.' * n)
+        except OSError:
+            pass
+
+    def key(self, input_md, config=None, engine=DEFAULT_ENGINE, template=None, compression=None,
+            chunk_chars=None):
+        """Return the cache key of converting the file input_md
+
+        config is the raw config dict, or None for load_config(), and
+        template the reference .docx path, if any. chunk_chars is the chunk
+        size of a streamed conversion, whose zip layout differs, or None for
+        a serial or parallel one.
+        """
+        with open(input_md, 'rb') as f:
+            data = f.read()
+        return cache_key(data, config, engine=engine, compression=compression, chunk_chars=chunk_chars,
+                         template=file_digest(template) if template is not None else None)
+
+    def _read_entry(self, key):
+        """Return (document filename, image files) of an entry, or None if it is missing or unreadable"""
+        try:
+            with open(self._path(key + _ENTRY_SUFFIX), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            return entry['document'] + _DOCUMENT_SUFFIX, dict(entry['files'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _load(self, key, base_dir):
+        """Return the document path of a valid entry, or None"""
+        entry = self._read_entry(key)
+        if entry is None:
+            return None
+        document, files = entry
+        for path, digest in files.items():
+            if file_digest(os.path.join(base_dir, path)) != digest:
+                return None
+        return self._path(document)
+
+    def fetch(self, key, output, base_dir):
+        """Write the cached document for key to output and return True, or return False on a miss
+
+        output is a path or a writable binary stream. base_dir is the
+        directory of the input, against which the entry's image files are
+        checked.
+        """
+        document = self._load(key, base_dir)
+        if document is not None:
+            try:
+                self._write(document, output)
+            except FileNotFoundError:
+                # Evicted by another process since the entry was read
+                document = None
+        if document is None:
+            self._count('misses')
+            return False
+        try:
+            os.utime(self._path(key + _ENTRY_SUFFIX))
+        except OSError:
+            pass
+        self._count('hits')
+        return True
+
+    def _write(self, document, output):
+        """Copy or link a cached document to a path or binary stream"""
+        if not isinstance(output, (str, os.PathLike)):
+            with open(document, 'rb') as f:
+                shutil.copyfileobj(f, output)
+            return
+        fd, tmp_path = temp_file_beside(output)
+        os.close(fd)
+        try:
+            linked = False
+            if self.link:
+                os.remove(tmp_path)
+                try:
+                    os.link(document, tmp_path)
+                    linked = True
+                except OSError:
+                    # Another file system, or links not supported
+                    pass
+            if not linked:
+                shutil.copyfile(document, tmp_path)
+            os.replace(tmp_path, output)
+        except BaseException:
+            _remove(tmp_path)
+            raise
+
+    def store(self, key, source, base_dir, image_files=()):
+        """Store the converted document for key
+
+        source is the path of the document or its bytes. image_files are the
+        paths of the image files the conversion read, as collected in
+        Converter.image_files; they are recorded relative to base_dir.
+        """
+        if isinstance(source, (bytes, bytearray)):
+            data = bytes(source)
+        else:
+            with open(source, 'rb') as f:
+                data = f.read()
+        os.makedirs(self.directory, exist_ok=True)
+        name = hashlib.blake2b(data, digest_size=20).hexdigest()
+        document = self._path(name + _DOCUMENT_SUFFIX)
+        # Bytes the directory grows by; an existing document is shared
+        added = 0
+        if not os.path.exists(document):
+            atomic_write_bytes(document, data)
+            # Read-only, so an output hard-linked to it is not edited in place by accident
+            os.chmod(document, 0o444)
+            added = len(data)
+        files = {
+            os.path.relpath(path, base_dir): file_digest(path)
+            for path in sorted(image_files)
+        }
+        previous = self._read_entry(key)
+        entry = json.dumps({'document': name, 'files': files}, sort_keys=True)
+        atomic_write_bytes(self._path(key + _ENTRY_SUFFIX), entry.encode('utf-8'))
+        # The replaced document, e.g. from before an image changed, is no longer referenced
+        if previous is not None and previous[0] != name + _DOCUMENT_SUFFIX:
+            previous_path = self._path(previous[0])
+            try:
+                added -= os.path.getsize(previous_path)
+            except OSError:
+                pass
+            _remove(previous_path)
+        if self._size is None:
+            self._size = _documents_size(self._entries())
+        else:
+            self._size += added
+        if self._size > self.max_size:
+            self.evict()
+
+    def _entries(self):
+        """Return (mtime, key, document filename, document size) for every entry"""
+        entries = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(_ENTRY_SUFFIX) or filename.startswith('.'):
+                continue
+            key = filename[:-len(_ENTRY_SUFFIX)]
+            entry = self._read_entry(key)
+            if entry is None:
+                continue
+            try:
+                mtime = os.stat(self._path(filename)).st_mtime
+                size = os.path.getsize(self._path(entry[0]))
+            except OSError:
+                continue
+            entries.append((mtime, key, entry[0], size))
+        return entries
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits its size limit"""
+        entries = sorted(self._entries())
+        total = _documents_size(entries)
+        removed = set()
+        evicted = 0
+        for mtime, key, document, size in entries:
+            if total <= self.max_size:
+                break
+            _remove(self._path(key + _ENTRY_SUFFIX))
+            # Another entry may share the document; it then misses and is stored again
+            if document not in removed:
+                _remove(self._path(document))
+                removed.add(document)
+                total -= size
+            evicted += 1
+        self._size = total
+        if evicted:
+            self._count('evictions', evicted)
+
+    def _fold_stat(self, stat):
+        """Return a statistic of the directory, folding its appended events into its count file
+
+        The events file is renamed first, so events appended meanwhile go to
+        a new one. A renamed file is only folded once appends in flight can
+        no longer reach it, and counted as is until then.
+        """
+        count_path = self._path(stat + _COUNT_SUFFIX)
+        try:
+            with open(count_path, 'rb') as f:
+                count = int(f.read())
+        except (OSError, ValueError):
+            count = 0
+        now = time.time_ns()
+        try:
+            os.replace(self._path(stat), self._path(f'{stat}.{now}.{os.getpid()}{_PENDING_SUFFIX}'))
+        except OSError:
+            # No events since the last rename
+            pass
+        try:
+            filenames = os.listdir(self.directory)
+        except OSError:
+            return count
+        recent = 0
+        folded = []
+        for filename in filenames:
+            if not filename.startswith(stat + '.') or not filename.endswith(_PENDING_SUFFIX):
+                continue
+            try:
+                renamed = int(filename.split('.')[1])
+                size = os.path.getsize(self._path(filename))
+            except (ValueError, OSError):
+                continue
+            if now - renamed < _FOLD_DELAY_NS:
+                recent += size
+            else:
+                count += size
+                folded.append(filename)
+        if folded:
+            atomic_write_bytes(count_path, str(count).encode('ascii'))
+            for filename in folded:
+                _remove(self._path(filename))
+        return count + recent
+
+    def stats(self):
+        """Return the hit, miss and eviction counts of every process and the current contents"""
+        stats = {}
+        for stat in _STATS:
+            stats[stat] = self._fold_stat(stat)
+        entries = self._entries() if os.path.isdir(self.directory) else []
+        stats['entries'] = len(entries)
+        stats['size'] = _documents_size(entries)
+        return stats
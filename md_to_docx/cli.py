@@ -0,0 +1,333 @@
+"""
+Command-line interface for md-to-docx
+"""
+
+import io
+import os
+import sys
+import json
+import argparse
+
+from .engines import ENGINES, DEFAULT_ENGINE
+from .defaults import (
+    DEFAULT_CHUNK_CHARS,
+    DEFAULT_PORT,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_CACHE_SIZE_MB,
+    STORED,
+    BOOK_CACHE_DIR
+)
+
+
+def parse_compression(value):
+    """Argument type for --compression: 'stored' or a deflate level 0-9"""
+    if value == STORED:
+        return STORED
+    try:
+        level = int(value)
+    except ValueError:
+        level = -1
+    if not 0 <= level <= 9:
+        raise argparse.ArgumentTypeError(f"expected '{STORED}' or a deflate level 0-9, got {value!r}")
+    return level
+
+
+def build_parser():
+    """Create the argument parser for the command-line interface"""
+    parser = argparse.ArgumentParser(description='Convert Markdown to Word document')
+    parser.add_argument('input_md', nargs='?', help='Input Markdown file')
+    parser.add_argument('output_docx', nargs='?', help="Output Word document file, or '-' for stdout (optional, defaults to input name with .docx extension)")
+    parser.add_argument('--open', action='store_true', help='Open the file with the default application after creation')
+    # Opening is opt-in now; --no-show is kept so existing scripts keep working
+    parser.add_argument('--no-show', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--compression', type=parse_compression, metavar='LEVEL',
+                        help=f"Zip compression: '{STORED}' for none (fastest) or a deflate level 0-9 (default: 6)")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default=DEFAULT_ENGINE,
+                        help='Parsing engine: html re-parses rendered HTML, tree reads the Markdown tree directly (default: %(default)s)')
+    parser.add_argument('--template', help='Reference .docx whose styles, page setup, headers and footers are reused')
+    parser.add_argument('--stream', action='store_true', help='Read and convert the input in chunks to bound memory on very large files')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_CHARS, metavar='CHARS',
+                        help='Approximate characters per chunk for --stream (default: %(default)s)')
+    parser.add_argument('--batch', nargs='+', metavar='PATH', help='Convert directories, files or glob patterns in parallel without prompting')
+    parser.add_argument('--output-dir', help='Output root for --batch (defaults to next to each input)')
+    parser.add_argument('--parallel', action='store_true',
+                        help='Render chunks of one large input in worker processes; output is identical to a serial run')
+    parser.add_argument('--book', action='store_true',
+                        help='Treat input_md as a manifest listing chapter files, one per line, and build them into one document')
+    parser.add_argument('--book-cache', metavar='DIR',
+                        help=f'Chapter cache for --book (default: {BOOK_CACHE_DIR} next to the manifest)')
+    parser.add_argument('--cache', metavar='DIR',
+                        help='Reuse documents converted before with the same input, config, version and options from DIR, and store new ones there')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE_MB, metavar='MB',
+                        help='Size limit of --cache; least recently used documents are evicted beyond it (default: %(default)s)')
+    parser.add_argument('--cache-link', action='store_true',
+                        help='Hard-link documents served from --cache instead of copying them; outputs must then not be edited in place')
+    parser.add_argument('--cache-stats', action='store_true', help='Print the hit, miss and eviction counts of --cache')
+    parser.add_argument('--workers', type=int, help='Number of worker processes for --batch, --parallel, --book and --serve (defaults to CPU count)')
+    parser.add_argument('--report', help='Write the --batch summary report as JSON to this file')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and re-convert on every save, re-rendering only changed blocks (does not open the file)')
+    parser.add_argument('--serve', action='store_true', help='Run the HTTP conversion service on localhost')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port for --serve (default: %(default)s)')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help='Requests --serve queues beyond its busy workers before answering 503 (default: %(default)s)')
+    parser.add_argument('--image-root', metavar='DIR',
+                        help='Directory --serve requests may embed images from, resolving relative paths against it (default: no local images)')
+    parser.add_argument('--profile', nargs='?', const='-', metavar='FILE',
+                        help='Record per-stage time and memory and per-element counts as JSON to FILE (default: stderr)')
+    return parser
+
+
+def open_cache(args):
+    """Return the OutputCache selected by --cache, or None"""
+    if not args.cache:
+        return None
+    from .cache import OutputCache
+    return OutputCache(args.cache, args.cache_size << 20, args.cache_link)
+
+
+def print_cache_stats(cache, file=None):
+    """Print the statistics of every process using a cache directory"""
+    stats = cache.stats()
+    print(f"Cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions, "
+          f"{stats['entries']} entries ({stats['size'] / (1 << 20):.1f} MB)", file=file)
+
+
+def run_batch_mode(args):
+    """Run --batch conversion and print a summary"""
+    from .config import ConfigError
+    from .batch import run_batch
+
+    cache = open_cache(args)
+    try:
+        summary = run_batch(args.batch, output_dir=args.output_dir, workers=args.workers,
+                            engine=args.engine, template=args.template, compression=args.compression,
+                            cache=cache)
+    except ConfigError as e:
+        print(f"Error: {e}")
+        return 1
+    for failure in summary['failed']:
+        print(f"Failed: {failure['input']}: {failure['error']}")
+    cached = sum(1 for item in summary['succeeded'] if item['cached'])
+    print(f"Converted {len(summary['succeeded'])} of {summary['total']} files "
+          f"in {summary['elapsed']:.2f}s ({len(summary['failed'])} failed, {cached} from cache)")
+    if cache is not None and args.cache_stats:
+        print_cache_stats(cache)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+    return 1 if summary['failed'] else 0
+
+
+def write_profile(profiler, destination):
+    """Write a profiler's measurements as JSON to a file, or stderr for '-'"""
+    if destination == '-':
+        sys.stderr.write(profiler.to_json(indent=2) + '\n')
+    else:
+        with open(destination, 'w', encoding='utf-8') as f:
+            f.write(profiler.to_json(indent=2))
+
+
+def run_watch_mode(converter, input_md, output_docx):
+    """Re-convert input_md on every change until interrupted"""
+    from .incremental import watch
+
+    def on_update(seconds, rendered, reused):
+        print(f"Updated {output_docx} in {seconds * 1000:.0f} ms "
+              f"({rendered} blocks rendered, {reused} reused)")
+
+    def on_error(error):
+        print(f"Error converting {input_md}: {error}")
+
+    print(f"Watching {input_md} (Ctrl+C to stop)")
+    try:
+        watch(converter, input_md, output_docx, on_update=on_update, on_error=on_error)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def run_serve_mode(args):
+    """Run the localhost conversion service until interrupted"""
+    from .config import ConfigError
+    from .service import serve
+
+    def ready(address):
+        print(f"Serving on http://{address[0]}:{address[1]} (Ctrl+C to stop)")
+
+    try:
+        serve(args.port, workers=args.workers, queue_size=args.queue_size,
+              engine=args.engine, template=args.template, ready=ready, image_root=args.image_root)
+    except ConfigError as e:
+        print(f"Error: {e}")
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv=None):
+    """Run the command-line interface and return the exit code"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.template and not os.path.exists(args.template):
+        print(f"Error: Template file '{args.template}' not found.")
+        return 1
+
+    if args.serve:
+        if args.input_md or args.output_docx or args.batch:
+            parser.error('input_md/output_docx/--batch cannot be combined with --serve')
+        return run_serve_mode(args)
+
+    if args.batch:
+        if args.input_md or args.output_docx:
+            parser.error('input_md/output_docx cannot be combined with --batch')
+        if args.stream or args.parallel or args.watch or args.book or args.profile or args.open:
+            parser.error('--batch cannot be combined with --stream, --parallel, --watch, --book, '
+                         '--profile or --open')
+        return run_batch_mode(args)
+    if not args.input_md:
+        parser.error('input_md is required unless --batch is given')
+    if args.watch and (args.stream or args.profile):
+        parser.error('--watch cannot be combined with --stream or --profile')
+    if args.parallel and (args.stream or args.watch):
+        parser.error('--parallel cannot be combined with --stream or --watch')
+    if args.book and (args.stream or args.watch or args.parallel):
+        parser.error('--book cannot be combined with --stream, --watch or --parallel')
+    if args.cache and (args.watch or args.book):
+        parser.error('--cache cannot be combined with --watch or --book')
+
+    input_md = args.input_md
+    to_stdout = args.output_docx == '-'
+    if to_stdout and (args.watch or args.open):
+        parser.error("--watch and --open need an output file, not '-'")
+    # Keep stdout clean for the document when writing it there
+    status = sys.stderr if to_stdout else sys.stdout
+
+    # If output file not specified, use input filename with .docx extension
+    if args.output_docx:
+        output_docx = args.output_docx
+    else:
+        base_name = os.path.splitext(input_md)[0]
+        output_docx = f"{base_name}.docx"
+
+    # Check if input file exists
+    if not os.path.exists(input_md):
+        print(f"Error: Input file '{input_md}' not found.", file=status)
+        return 1
+
+    # Check if output file exists
+    if not to_stdout and os.path.exists(output_docx):
+        response = input(f"{output_docx} already exists. Delete and overwrite? (y/n): ")
+        if response.lower() != 'y':
+            print("Operation cancelled.")
+            return 0
+        try:
+            os.remove(output_docx)
+        except PermissionError:
+            print(f"Error: Cannot delete {output_docx}. The file may be open in another program.")
+            print("Please close the file and try again.")
+            return 1
+
+    # A cache hit is served before any heavy dependency loads
+    cache = open_cache(args)
+    if cache is not None:
+        base_dir = os.path.dirname(os.path.abspath(input_md))
+        cache_key = cache.key(input_md, engine=args.engine, template=args.template,
+                              compression=args.compression,
+                              chunk_chars=args.chunk_size if args.stream else None)
+        output = sys.stdout.buffer if to_stdout else output_docx
+        try:
+            hit = cache.fetch(cache_key, output, base_dir)
+        except OSError as e:
+            print(f"Error saving file: {e}", file=status)
+            return 1
+        if hit:
+            if to_stdout:
+                sys.stdout.buffer.flush()
+            else:
+                print(f"Successfully created {output_docx} (from cache)")
+            if args.cache_stats:
+                print_cache_stats(cache, status)
+            if args.open:
+                from .output import open_document
+                open_document(output_docx)
+            return 0
+
+    # Heavy dependencies load only once there is something to convert
+    from .config import ConfigError
+    from .converter import Converter
+
+    profiler = None
+    if args.profile:
+        from .profiling import Profiler
+        profiler = Profiler()
+
+    try:
+        converter = Converter(engine=args.engine, template=args.template, profiler=profiler)
+    except ConfigError as e:
+        print(f"Error: {e}", file=status)
+        return 1
+
+    if args.watch:
+        return run_watch_mode(converter, input_md, output_docx)
+
+    output = sys.stdout.buffer if to_stdout else output_docx
+    if cache is not None:
+        # Collect the image files the output depends on for the cache entry
+        converter.image_files = {}
+        if to_stdout:
+            output = io.BytesIO()
+    try:
+        if args.stream:
+            converter.convert_file_streaming(input_md, output, args.chunk_size,
+                                             compression=args.compression)
+        elif args.book:
+            from .book import BookBuilder
+            builder = BookBuilder(converter, args.workers, args.book_cache)
+            builder.convert_manifest(input_md, output, compression=args.compression)
+            print(f"Rendered {builder.rendered} chapters, reused {builder.reused} from cache",
+                  file=status)
+        elif args.parallel:
+            from .parallel import ParallelConverter
+            with ParallelConverter(converter, args.workers) as parallel:
+                parallel.convert_file(input_md, output, compression=args.compression)
+        else:
+            converter.convert_file(input_md, output, compression=args.compression)
+        if cache is not None:
+            stored = output.getvalue() if to_stdout else output_docx
+            try:
+                cache.store(cache_key, stored, base_dir, converter.image_files)
+            except OSError as e:
+                print(f"Warning: Could not store the document in the cache ({e})", file=status)
+            if to_stdout:
+                sys.stdout.buffer.write(stored)
+        if to_stdout:
+            sys.stdout.buffer.flush()
+        else:
+            print(f"Successfully created {output_docx}")
+        if cache is not None and args.cache_stats:
+            print_cache_stats(cache, status)
+
+        if profiler is not None:
+            profiler.stop()
+            write_profile(profiler, args.profile)
+
+        if args.open:
+            from .output import open_document
+            open_document(output_docx)
+    except BrokenPipeError:
+        # The reading process went away; nothing useful left to report
+        return 1
+    except PermissionError:
+        print(f"Error: Cannot save {output_docx}. The file may be open in another program.")
+        print("Please close the file and try again.")
+        return 1
+    except Exception as e:
+        print(f"Error saving file: {e}", file=status)
+        return 1
+
+    return 0
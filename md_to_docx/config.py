@@ -3,88 +3,306 @@ Configuration loading and management
 """
 
 import os
-import json
-
-
-def load_config():
-    """Load configuration from config.json or use defaults"""
-    default_config = {
-        "headings": {
-            "h1": {
-                "font_name": "Calibri",
-                "font_size": 16,
-                "bold": True,
-                "italic": False,
-                "color": "2E75B6",
-                "space_before": 12,
-                "space_after": 6
-            },
-            "h2": {
-                "font_name": "Calibri",
-                "font_size": 14,
-                "bold": True,
-                "italic": False,
-                "color": "000000",
-                "space_before": 10,
-                "space_after": 4
-            },
-            "h3": {
-                "font_name": "Calibri",
-                "font_size": 12,
-                "bold": True,
-                "italic": False,
-                "color": "000000",
-                "space_before": 8,
-                "space_after": 3
-            },
-            "h4": {
-                "font_name": "Calibri",
-                "font_size": 11,
-                "bold": True,
-                "italic": False,
-                "color": "000000",
-                "space_before": 6,
-                "space_after": 2
-            }
-        },
-        "codeblock": {
-            "font_name": "Courier New",
-            "font_size": 10,
-            "background_color": "F2F2F2",
-            "cell_margin": 3,
-            "line_spacing": 1.0
+from dataclasses import dataclass
+
+from docx.shared import Pt, Mm, RGBColor
+from docx.enum.table import WD_CELL_VERTICAL_ALIGNMENT
+
+# Defaults and loading live in the light defaults module for cache lookups
+from .defaults import (
+    DEFAULT_CONFIG_PATH,
+    CODE_TOKEN_TYPES,
+    DEFAULT_CODE_TOKENS,
+    load_config
+)
+
+
+class ConfigError(ValueError):
+    """Raised when a configuration does not match the schema"""
+
+
+# Value kinds used by the schema
+_NUMBER = 'number'
+_INTEGER = 'integer'
+_BOOL = 'bool'
+_STRING = 'string'
+_COLOR = 'color'
+_ALIGNMENT = 'alignment'
+
+_HEADING_SCHEMA = {
+    "font_name": _STRING,
+    "font_size": _NUMBER,
+    "bold": _BOOL,
+    "italic": _BOOL,
+    "color": _COLOR,
+    "space_before": _NUMBER,
+    "space_after": _NUMBER,
+}
+
+_TOKEN_SCHEMA = {
+    "color": _COLOR,
+    "bold": _BOOL,
+    "italic": _BOOL,
+}
+
+CONFIG_SCHEMA = {
+    "headings": {f"h{level}": _HEADING_SCHEMA for level in range(1, 7)},
+    "codeblock": {
+        "font_name": _STRING,
+        "font_size": _NUMBER,
+        "background_color": _COLOR,
+        "cell_margin": _NUMBER,
+        "line_spacing": _NUMBER,
+        "highlight": _BOOL,
+        "highlight_max_chars": _INTEGER,
+        "tokens": {name: _TOKEN_SCHEMA for name in CODE_TOKEN_TYPES},
+    },
+    "paragraph": dict(_HEADING_SCHEMA, line_spacing=_NUMBER),
+    "table": {
+        "header": {
+            "font_name": _STRING,
+            "font_size": _NUMBER,
+            "bold": _BOOL,
+            "uppercase": _BOOL,
+            "vertical_alignment": _ALIGNMENT,
         },
-        "paragraph": {
-            "font_name": "Calibri",
-            "font_size": 11,
-            "bold": False,
-            "italic": False,
-            "color": "000000",
-            "space_before": 0,
-            "space_after": 8,
-            "line_spacing": 1.15
+        "data": {
+            "font_name": _STRING,
         },
-        "table": {
-            "header": {
-                "font_name": "Calibri",
-                "font_size": 10,
-                "bold": True,
-                "uppercase": True,
-                "vertical_alignment": "bottom"
-            },
-            "data": {
-                "font_name": "Calibri"
-            }
-        }
-    }
-    
-    # Look for config.json in the script's directory
-    config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.json')
-    if os.path.exists(config_path):
+        "bulk_threshold": _INTEGER,
+        "stream_threshold": _INTEGER,
+    },
+}
+
+_VERTICAL_ALIGNMENTS = {
+    'top': WD_CELL_VERTICAL_ALIGNMENT.TOP,
+    'center': WD_CELL_VERTICAL_ALIGNMENT.CENTER,
+    'bottom': WD_CELL_VERTICAL_ALIGNMENT.BOTTOM,
+}
+
+
+def _check_value(kind, value):
+    """Return True if value is valid for the schema kind"""
+    if kind == _BOOL:
+        return isinstance(value, bool)
+    if kind == _NUMBER:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if kind == _INTEGER:
+        return isinstance(value, int) and not isinstance(value, bool)
+    if kind == _STRING:
+        return isinstance(value, str)
+    if kind == _COLOR:
+        if not isinstance(value, str) or len(value) != 6:
+            return False
+        try:
+            int(value, 16)
+        except ValueError:
+            return False
+        return True
+    if kind == _ALIGNMENT:
+        return isinstance(value, str) and value.lower() in _VERTICAL_ALIGNMENTS
+    return False
+
+
+def _validate(config, schema, path, errors):
+    """Collect schema errors for a config section"""
+    if not isinstance(config, dict):
+        errors.append(f"{path or 'config'}: expected an object")
+        return
+    for key, value in config.items():
+        where = f"{path}.{key}" if path else key
+        if key not in schema:
+            errors.append(f"{where}: unknown key")
+        elif isinstance(schema[key], dict):
+            _validate(value, schema[key], where, errors)
+        elif not _check_value(schema[key], value):
+            errors.append(f"{where}: invalid {schema[key]} value {value!r}")
+
+
+def validate_config(config):
+    """Raise ConfigError listing every key or value that does not match the schema"""
+    errors = []
+    _validate(config, CONFIG_SCHEMA, '', errors)
+    if errors:
+        raise ConfigError("Invalid configuration:\n  " + "\n  ".join(errors))
+
+
+@dataclass(frozen=True, slots=True)
+class FontSpec:
+    """Precomputed font settings"""
+    name: str
+    size: Pt
+    bold: bool
+    italic: bool
+    color: RGBColor = None
+
+
+@dataclass(frozen=True, slots=True)
+class BlockSpec:
+    """Precomputed font and spacing settings for paragraphs and headings"""
+    font: FontSpec
+    space_before: Pt
+    space_after: Pt
+    line_spacing: float = None
+
+
+@dataclass(frozen=True, slots=True)
+class TokenSpec:
+    """Precomputed character formatting of a highlighted code token category"""
+    bold: bool = None
+    italic: bool = None
+    color: RGBColor = None
+
+
+@dataclass(frozen=True, slots=True)
+class CodeBlockSpec:
+    """Precomputed code block settings
+
+    tokens is a tuple of (category, TokenSpec) pairs in CODE_TOKEN_TYPES
+    order, so the spec stays hashable.
+    """
+    font: FontSpec
+    line_spacing: float
+    background_color: str
+    cell_margin: Mm
+    highlight: bool
+    highlight_max_chars: int
+    tokens: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class TableSpec:
+    """Precomputed table settings"""
+    header_font: FontSpec
+    uppercase: bool
+    vertical_alignment: str
+    vertical_alignment_enum: WD_CELL_VERTICAL_ALIGNMENT
+    data_font_name: str
+    bulk_threshold: int
+    stream_threshold: int
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledConfig:
+    """Validated configuration with all derived values computed once"""
+    paragraph: BlockSpec
+    headings: dict
+    codeblock: CodeBlockSpec
+    table: TableSpec
+    raw: dict
+
+
+def _rgb(color):
+    """Return an RGBColor for a 6-digit hex string, or None"""
+    if color:
+        return RGBColor.from_string(color.upper())
+    return None
+
+
+def _font(section, font_name, font_size, bold, italic):
+    """Compile the font keys of a config section"""
+    return FontSpec(
+        name=section.get('font_name', font_name),
+        size=Pt(section.get('font_size', font_size)),
+        bold=section.get('bold', bold),
+        italic=section.get('italic', italic),
+        color=_rgb(section.get('color')),
+    )
+
+
+def compile_config(config):
+    """Validate a config dict and precompute lengths, colors and enums"""
+    validate_config(config)
+
+    paragraph_config = config.get('paragraph', {})
+    paragraph = BlockSpec(
+        font=_font(paragraph_config, 'Calibri', 11, False, False),
+        space_before=Pt(paragraph_config.get('space_before', 0)),
+        space_after=Pt(paragraph_config.get('space_after', 8)),
+        line_spacing=paragraph_config.get('line_spacing', 1.15),
+    )
+
+    headings = {}
+    for heading_name, heading_config in config.get('headings', {}).items():
+        headings[heading_name] = BlockSpec(
+            font=_font(heading_config, 'Calibri', 12, True, False),
+            space_before=Pt(heading_config.get('space_before', 0)),
+            space_after=Pt(heading_config.get('space_after', 0)),
+        )
+
+    codeblock_config = config.get('codeblock', {})
+    token_configs = codeblock_config.get('tokens', DEFAULT_CODE_TOKENS)
+    tokens = []
+    for name in CODE_TOKEN_TYPES:
+        if name in token_configs:
+            token_config = token_configs[name]
+            tokens.append((name, TokenSpec(
+                bold=token_config.get('bold'),
+                italic=token_config.get('italic'),
+                color=_rgb(token_config.get('color')),
+            )))
+    codeblock = CodeBlockSpec(
+        font=FontSpec(
+            name=codeblock_config.get('font_name', 'Courier New'),
+            size=Pt(codeblock_config.get('font_size', 10)),
+            bold=False,
+            italic=False,
+        ),
+        line_spacing=codeblock_config.get('line_spacing', 1.0),
+        background_color=codeblock_config.get('background_color', 'F2F2F2'),
+        cell_margin=Mm(codeblock_config.get('cell_margin', 3)),
+        highlight=codeblock_config.get('highlight', False),
+        highlight_max_chars=codeblock_config.get('highlight_max_chars', 20000),
+        tokens=tuple(tokens),
+    )
+
+    table_config = config.get('table', {})
+    header_config = table_config.get('header', {})
+    alignment = header_config.get('vertical_alignment', 'bottom').lower()
+    table = TableSpec(
+        header_font=FontSpec(
+            name=header_config.get('font_name', 'Calibri'),
+            size=Pt(header_config.get('font_size', 10)),
+            bold=header_config.get('bold', True),
+            italic=False,
+        ),
+        uppercase=header_config.get('uppercase', True),
+        vertical_alignment=alignment,
+        vertical_alignment_enum=_VERTICAL_ALIGNMENTS[alignment],
+        data_font_name=table_config.get('data', {}).get('font_name', 'Calibri'),
+        bulk_threshold=table_config.get('bulk_threshold', 50),
+        stream_threshold=table_config.get('stream_threshold', 5000),
+    )
+
+    return CompiledConfig(
+        paragraph=paragraph,
+        headings=headings,
+        codeblock=codeblock,
+        table=table,
+        raw=config,
+    )
+
+
+# Compiled configs keyed by (path, mtime), so a changed file is picked up
+_compiled_cache = {}
+
+
+def load_compiled_config(path=None):
+    """Load, validate and compile a config file, memoized per path and mtime"""
+    config_path = os.path.abspath(path or DEFAULT_CONFIG_PATH)
+    try:
+        mtime = os.stat(config_path).st_mtime_ns
+    except OSError:
+        mtime = None
+    key = (config_path, mtime)
+    compiled = _compiled_cache.get(key)
+    if compiled is None:
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Warning: Could not load config.json ({e}), using defaults")
-            return default_config
-    return default_config
+            compiled = compile_config(load_config(config_path))
+        except ConfigError as e:
+            raise ConfigError(f"{config_path}: {e}") from None
+        # Only the current version of each file is kept
+        for stale in [k for k in _compiled_cache if k[0] == config_path]:
+            del _compiled_cache[stale]
+        _compiled_cache[key] = compiled
+    return compiled
@@ -0,0 +1,268 @@
+"""
+In-memory Markdown to Word conversion
+"""
+
+import io
+import os
+import json
+import time
+from collections import OrderedDict
+
+import markdown
+
+from .config import compile_config, load_compiled_config
+from .utils import fix_markdown_tables, iter_fixed_table_lines
+from .renderer import render_block, render_table_rows
+from .template import styled_template, clone_document
+from .streaming import (
+    DEFAULT_CHUNK_CHARS,
+    ZIP64_INPUT_SIZE,
+    StreamingDocxWriter,
+    iter_markdown_chunks,
+    body_xml,
+    fragment_rels,
+    reference_definitions
+)
+from .engines import ENGINES, DEFAULT_ENGINE, get_engine
+from .profiling import stage
+from .output import zip_compression, save_document
+from .images import ImageLoader
+from .pipetable import PipeTable, PipeTableFinder
+from .formatters import start_bulk_table
+
+
+MARKDOWN_EXTENSIONS = ["fenced_code", "tables"]
+
+
+class Converter:
+    """Reusable converter holding the compiled config and a warm Markdown parser"""
+
+    def __init__(self, config=None, engine=DEFAULT_ENGINE, template=None, profiler=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of: {', '.join(ENGINES)}")
+        if config is None:
+            self.settings = load_compiled_config()
+        else:
+            self.settings = compile_config(config)
+        self.config = self.settings.raw
+        self.engine = engine
+        self.template = template
+        # Optional profiling.Profiler; None keeps every hot path uninstrumented
+        self.profiler = profiler
+        # Optional dict collecting the image files conversions read,
+        # path -> images.file_key(), e.g. to know what an output depends on
+        self.image_files = None
+        # Local image files conversions may read: None for any, False for
+        # none, or a directory they must be in; see images.ImageLoader
+        self.image_root = None
+        self._iter_blocks = get_engine(engine)
+        self._markdown = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+
+    def iter_blocks(self, md_text):
+        """Preprocess Markdown text and yield its (tag, payload) blocks"""
+        # Fix markdown tables with blank lines between rows
+        with stage(self.profiler, 'preprocess'):
+            md_text = fix_markdown_tables(md_text)
+        return self._iter_blocks(self._markdown, md_text, self.profiler)
+
+    def new_document(self, share_styles=True):
+        """Create an empty Document with the config compiled into named styles
+
+        The template is parsed and styled once per process and cloned for each
+        call. With share_styles the clone shares its styles part with the
+        cached template, so pass share_styles=False before modifying styles.
+        """
+        with stage(self.profiler, 'template'):
+            return clone_document(styled_template(self.settings, self.template), share_styles)
+
+    def render_into(self, doc, md_text, base_dir=None):
+        """Render Markdown text at the end of an existing Document
+
+        Relative image paths resolve against base_dir, or the current
+        directory when it is None. Returns the image files the content
+        depends on, as a path -> images.file_key() mapping.
+        """
+        images = ImageLoader(doc, base_dir, self.image_root)
+        # Image files are read on a thread pool while the text is parsed
+        images.prefetch(md_text)
+        self._render_blocks(doc, self.iter_blocks(md_text), images)
+        if self.image_files is not None:
+            self.image_files.update(images.files)
+        return images.files
+
+    def _render_blocks(self, doc, blocks, images):
+        """Render blocks into a Document, timing each one when profiling"""
+        profiler = self.profiler
+        if profiler is None:
+            for block in blocks:
+                render_block(doc, block, self.settings, images)
+            return
+        # Block extraction is interleaved with rendering, so the 'render'
+        # stage includes it while per-element times cover render_block only
+        with profiler.stage('render'):
+            for block in blocks:
+                start = time.perf_counter()
+                render_block(doc, block, self.settings, images)
+                profiler.record_element(block[0], time.perf_counter() - start)
+
+    def build_document(self, md_text, base_dir=None):
+        """Convert Markdown text to a python-docx Document"""
+        if self.profiler is not None:
+            self.profiler.conversions += 1
+        doc = self.new_document()
+        self.render_into(doc, md_text, base_dir)
+        return doc
+
+    def save(self, doc, output, compression=None):
+        """Save a Document to a path or writable binary stream
+
+        compression is None for the default deflate level, output.STORED
+        for uncompressed entries, or a deflate level from 0 to 9.
+        """
+        with stage(self.profiler, 'save'):
+            save_document(doc, output, compression)
+
+    def convert(self, md_text, compression=None, base_dir=None):
+        """Convert Markdown text to DOCX bytes"""
+        buffer = io.BytesIO()
+        self.save(self.build_document(md_text, base_dir), buffer, compression)
+        return buffer.getvalue()
+
+    def convert_file(self, input_md, output_docx, compression=None):
+        """Convert a Markdown file and save the result to a path or binary stream"""
+        with stage(self.profiler, 'read'):
+            with open(input_md, "r", encoding="utf-8") as f:
+                md_content = f.read()
+        base_dir = os.path.dirname(os.path.abspath(input_md))
+        self.save(self.build_document(md_content, base_dir), output_docx, compression)
+
+    def convert_stream(self, lines, output, chunk_chars=DEFAULT_CHUNK_CHARS, large=False,
+                       compression=None, base_dir=None, definitions=None):
+        """Convert an iterable of Markdown lines to DOCX in bounded memory
+
+        The input is rendered chunk by chunk and each chunk's body XML is
+        streamed into the output zip, so memory stays proportional to the
+        largest chunk. output is a path or a writable binary file object,
+        which need not be seekable. Set large for outputs that may exceed 4 GB.
+
+        definitions are reference-style link definition lines appended to
+        every chunk, as streaming.reference_definitions() collects them in a
+        first pass over the input; without them, definitions only apply
+        within their own chunk.
+
+        Pipe tables with at least the configured table.stream_threshold rows
+        are rendered in batches of rows, so they need not fit in memory
+        either; see md_to_docx.pipetable.
+        """
+        if self.profiler is not None:
+            self.profiler.conversions += 1
+        method, level = zip_compression(compression)
+        base = self.new_document()
+        base_rids = frozenset(base.part.rels)
+        table_config = self.settings.table
+        # Smaller tables would not be bulk tables, whose layout the batches reproduce
+        tables = PipeTableFinder(self._markdown, max(table_config.stream_threshold,
+                                                     table_config.bulk_threshold))
+        suffix = '\n\n' + '\n'.join(definitions) if definitions else ''
+        with StreamingDocxWriter(base, output, compression=method, large=large,
+                                 compresslevel=level) as writer:
+            # Table rows are joined before chunking so a chunk never splits a table
+            for chunk in iter_markdown_chunks(iter_fixed_table_lines(lines), chunk_chars, tables):
+                if isinstance(chunk, PipeTable):
+                    self._stream_table(writer, chunk, base_rids, base_dir, suffix)
+                    continue
+                doc = self.new_document()
+                self.render_into(doc, chunk + suffix, base_dir)
+                with stage(self.profiler, 'save'):
+                    fragment = body_xml(doc)
+                    writer.write(fragment, fragment_rels(doc, fragment, base_rids))
+
+    def _stream_table(self, writer, table, base_rids, base_dir=None, suffix=''):
+        """Render a PipeTable into a streaming writer one batch of rows at a time
+
+        suffix is appended to each batch's Markdown, e.g. link definitions.
+        """
+        doc = self.new_document()
+        images = ImageLoader(doc, base_dir, self.image_root)
+        tbl = start_bulk_table(doc, table.columns, self.settings.table.vertical_alignment)
+        doc.add_paragraph()
+        # The table's properties and closing tag around its rows, and the paragraph after it
+        head, tail = body_xml(doc).split(b'</w:tbl>')
+        tail = b'</w:tbl>' + tail
+        writer.write(head)
+        for first_row, md_text in table.batches():
+            md_text += suffix
+            images.prefetch(md_text)
+            for tag, rows in self.iter_blocks(md_text):
+                if tag != 'table':
+                    continue
+                if first_row == 1:
+                    start = 0
+                else:
+                    # Later batches repeat the header row the first one rendered
+                    rows = rows[1:]
+                    start = first_row
+                with stage(self.profiler, 'render'):
+                    render_table_rows(tbl, rows, start, self.settings, images)
+            with stage(self.profiler, 'save'):
+                xml = body_xml(doc)
+                rows_xml = xml[len(head):len(xml) - len(tail)]
+                writer.write(rows_xml, fragment_rels(doc, rows_xml, base_rids))
+                # Drop the written rows, keeping the tblPr and tblGrid
+                del tbl[2:]
+        writer.write(tail)
+        if self.image_files is not None:
+            self.image_files.update(images.files)
+
+    def convert_file_streaming(self, input_md, output_docx, chunk_chars=DEFAULT_CHUNK_CHARS,
+                               compression=None):
+        """Convert a Markdown file with convert_stream(), reading it incrementally
+
+        A first pass collects the reference-style link definitions, so links
+        resolve across chunks; memory stays bounded by their number.
+        """
+        large = os.path.getsize(input_md) > ZIP64_INPUT_SIZE
+        base_dir = os.path.dirname(os.path.abspath(input_md))
+        with open(input_md, "r", encoding="utf-8") as f:
+            with stage(self.profiler, 'read'):
+                definitions = reference_definitions(line.rstrip('\r\n') for line in f)
+                f.seek(0)
+            self.convert_stream(f, output_docx, chunk_chars, large=large, compression=compression,
+                                base_dir=base_dir, definitions=definitions)
+
+
+_default_converter = None
+
+# Converters for explicit config dicts, keyed by their canonical JSON
+_config_converters = OrderedDict()
+_CONFIG_CONVERTERS_SIZE = 8
+
+
+def convert(md_text, config=None):
+    """Convert Markdown text to DOCX bytes
+
+    Without an explicit config a process-wide Converter is reused, so the
+    configuration is only loaded once. Converters for config dicts are
+    kept for the most recently used ones, so equal configs are compiled
+    and styled into a template only once.
+    """
+    global _default_converter
+    if config is not None:
+        try:
+            key = json.dumps(config, sort_keys=True)
+        except TypeError:
+            # Not a JSON config; it is validated and rejected or used as is
+            return Converter(config).convert(md_text)
+        converter = _config_converters.get(key)
+        if converter is None:
+            # A copy, so later changes to the caller's dict do not reach the cache
+            converter = Converter(json.loads(key))
+            _config_converters[key] = converter
+            if len(_config_converters) > _CONFIG_CONVERTERS_SIZE:
+                _config_converters.popitem(last=False)
+        else:
+            _config_converters.move_to_end(key)
+        return converter.convert(md_text)
+    if _default_converter is None:
+        _default_converter = Converter()
+    return _default_converter.convert(md_text)
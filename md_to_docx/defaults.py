@@ -0,0 +1,145 @@
+"""
+Default settings shared by the command line and the pipeline
+
+This module must stay free of heavy imports so the CLI can build its
+argument parser, load the config and look up cached outputs without
+loading markdown, python-docx, lxml or bs4.
+"""
+
+import os
+import copy
+import json
+
+
+# Characters collected before the streaming converter looks for a split point
+DEFAULT_CHUNK_CHARS = 1 << 20
+
+# Port and queue length of the conversion service
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 32
+
+# Compression value selecting uncompressed (stored) zip entries
+STORED = 'stored'
+
+# Chapter cache directory created next to a --book manifest
+BOOK_CACHE_DIR = '.md-to-docx-cache'
+
+# Size limit of the --cache output cache in megabytes
+DEFAULT_CACHE_SIZE_MB = 512
+
+# Configuration file used when no path is given
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.json')
+
+# Highlighted code token categories -> Pygments token type each one covers,
+# including its subtypes; the most specific configured category wins
+CODE_TOKEN_TYPES = {
+    "keyword": "Keyword",
+    "builtin": "Name.Builtin",
+    "function": "Name.Function",
+    "class": "Name.Class",
+    "decorator": "Name.Decorator",
+    "string": "Literal.String",
+    "number": "Literal.Number",
+    "comment": "Comment",
+    "operator": "Operator",
+}
+
+DEFAULT_CODE_TOKENS = {
+    "keyword": {"color": "0000FF", "bold": True},
+    "builtin": {"color": "795E26"},
+    "function": {"color": "795E26"},
+    "class": {"color": "267F99"},
+    "decorator": {"color": "AF00DB"},
+    "string": {"color": "A31515"},
+    "number": {"color": "098658"},
+    "comment": {"color": "008000", "italic": True},
+    "operator": {"color": "000000"},
+}
+
+DEFAULT_CONFIG = {
+    "headings": {
+        "h1": {
+            "font_name": "Calibri",
+            "font_size": 16,
+            "bold": True,
+            "italic": False,
+            "color": "2E75B6",
+            "space_before": 12,
+            "space_after": 6
+        },
+        "h2": {
+            "font_name": "Calibri",
+            "font_size": 14,
+            "bold": True,
+            "italic": False,
+            "color": "000000",
+            "space_before": 10,
+            "space_after": 4
+        },
+        "h3": {
+            "font_name": "Calibri",
+            "font_size": 12,
+            "bold": True,
+            "italic": False,
+            "color": "000000",
+            "space_before": 8,
+            "space_after": 3
+        },
+        "h4": {
+            "font_name": "Calibri",
+            "font_size": 11,
+            "bold": True,
+            "italic": False,
+            "color": "000000",
+            "space_before": 6,
+            "space_after": 2
+        }
+    },
+    "codeblock": {
+        "font_name": "Courier New",
+        "font_size": 10,
+        "background_color": "F2F2F2",
+        "cell_margin": 3,
+        "line_spacing": 1.0,
+        "highlight": False,
+        "highlight_max_chars": 20000,
+        "tokens": DEFAULT_CODE_TOKENS
+    },
+    "paragraph": {
+        "font_name": "Calibri",
+        "font_size": 11,
+        "bold": False,
+        "italic": False,
+        "color": "000000",
+        "space_before": 0,
+        "space_after": 8,
+        "line_spacing": 1.15
+    },
+    "table": {
+        "header": {
+            "font_name": "Calibri",
+            "font_size": 10,
+            "bold": True,
+            "uppercase": True,
+            "vertical_alignment": "bottom"
+        },
+        "data": {
+            "font_name": "Calibri"
+        },
+        "bulk_threshold": 50,
+        "stream_threshold": 5000
+    }
+}
+
+
+def load_config(path=None):
+    """Load configuration from config.json or use defaults"""
+    config_path = path or DEFAULT_CONFIG_PATH
+    if os.path.exists(config_path):
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not load config.json ({e}), using defaults")
+            return copy.deepcopy(DEFAULT_CONFIG)
+    return copy.deepcopy(DEFAULT_CONFIG)
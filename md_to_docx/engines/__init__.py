@@ -0,0 +1,36 @@
+"""
+Parsing engines that turn Markdown into (tag, payload) document blocks
+
+Engine modules are imported on first use, so listing the engine names does
+not load markdown or bs4.
+"""
+
+import importlib
+
+
+# Engine name -> module in this package providing iter_blocks(md, md_text, profiler)
+ENGINES = {
+    'html': 'soup',
+    'tree': 'tree',
+}
+
+DEFAULT_ENGINE = 'html'
+
+# Class prefix the fenced_code extension gives the language of a code block
+LANGUAGE_PREFIX = 'language-'
+
+
+def code_language(classes):
+    """Return the language named in the class attribute of a code element, or None"""
+    for name in classes.split():
+        if name.startswith(LANGUAGE_PREFIX):
+            return name[len(LANGUAGE_PREFIX):] or None
+    return None
+
+
+def get_engine(name):
+    """Return the iter_blocks function of the named engine"""
+    return importlib.import_module(f'.{ENGINES[name]}', __name__).iter_blocks
+
+
+__all__ = ['ENGINES', 'DEFAULT_ENGINE', 'LANGUAGE_PREFIX', 'code_language', 'get_engine']
@@ -0,0 +1,81 @@
+"""
+Block extraction from rendered HTML using BeautifulSoup
+"""
+
+from bs4 import BeautifulSoup, Tag, NavigableString, CData
+
+from . import code_language
+from ..inline import runs_from_events
+from ..profiling import stage
+
+
+# String types included in text, as in Tag.get_text(); comments are not
+_TEXT_TYPES = (NavigableString, CData)
+
+
+def _events(element):
+    """Yield inline content events for the children of a parsed element"""
+    for child in element.children:
+        if isinstance(child, Tag):
+            if child.name == 'img':
+                yield ('image', child.get('src'), child.get('alt', ''))
+                continue
+            yield ('start', child.name, child.get('style', ''), child.get('href'))
+            yield from _events(child)
+            yield ('end', child.name)
+        elif type(child) in _TEXT_TYPES:
+            yield ('text', str(child))
+
+
+def _runs(element):
+    """Return the coalesced inline runs of an element"""
+    return runs_from_events(_events(element))
+
+
+def element_to_block(element):
+    """Convert a top-level HTML element into a (tag, payload) block, or None"""
+    if not isinstance(element, Tag):
+        return None
+    name = element.name
+    if name in ("p", "h1", "h2", "h3", "h4", "h5", "h6"):
+        return (name, _runs(element))
+    if name == "pre":
+        code = element.find("code")
+        language = code_language(' '.join(code.get("class", []))) if code is not None else None
+        return (name, (element.get_text(), language))
+    if name in ("ul", "ol"):
+        return (name, [_runs(li) for li in element.find_all("li", recursive=False)])
+    if name == "table":
+        rows = [[(cell.name, _runs(cell)) for cell in row.find_all(["th", "td"])]
+                for row in element.find_all("tr")]
+        return (name, rows)
+    return None
+
+
+def _soup_blocks(soup):
+    """Yield the blocks of the top-level elements of a parsed fragment"""
+    for element in soup.find_all(recursive=False):
+        block = element_to_block(element)
+        if block is not None:
+            yield block
+
+
+def iter_html_blocks(html):
+    """Yield the blocks of an HTML fragment"""
+    yield from _soup_blocks(BeautifulSoup(html, "html.parser"))
+
+
+def iter_blocks(md, md_text, profiler=None):
+    """Yield blocks by rendering Markdown to HTML and re-parsing it
+
+    Markdown conversion and HTML parsing run before the first block is
+    requested, so a profiler can time them as separate stages.
+    """
+    with stage(profiler, 'markdown'):
+        try:
+            html = md.convert(md_text)
+        finally:
+            md.reset()
+    with stage(profiler, 'html_parse'):
+        soup = BeautifulSoup(html, "html.parser")
+    return _soup_blocks(soup)
@@ -0,0 +1,226 @@
+"""
+Block extraction straight from the Python-Markdown ElementTree
+
+This engine runs the Markdown preprocessors, block parser and tree
+processors, then reads blocks directly from the resulting ElementTree. The
+tree is never serialized to HTML and never re-parsed with BeautifulSoup.
+Text is decoded the same way the HTML round trip would decode it, so both
+engines produce identical blocks.
+"""
+
+import re
+import html
+
+from markdown import util
+from markdown.serializers import RE_AMP
+
+from . import code_language
+from ..inline import runs_from_events
+from ..profiling import stage
+
+
+# Start/end tags and comments inside stashed raw HTML
+_RAW_TAG_RE = re.compile(r'<(/?)([a-zA-Z][^\s/>]*)([^>]*)>|<!--.*?-->', re.S)
+_ATTR_RES = {
+    name: re.compile(rf'''\b{name}\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))''', re.I)
+    for name in ('style', 'href', 'src', 'alt', 'class')
+}
+# Fenced code blocks are stashed as raw HTML by the fenced_code extension
+_FENCED_CODE_RE = re.compile(r'^<pre[^>]*><code([^>]*)>(.*)</code></pre>$', re.S)
+
+_VOID_TAGS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+])
+
+_HEADINGS = frozenset(["h1", "h2", "h3", "h4", "h5", "h6"])
+
+
+def _decode_text(text):
+    """Decode tree text the way serializing it and re-parsing the HTML would"""
+    if '&' in text:
+        text = RE_AMP.sub('&amp;', text)
+    if util.AMP_SUBSTITUTE in text:
+        text = text.replace(util.AMP_SUBSTITUTE, '&')
+    if '&' in text:
+        text = html.unescape(text)
+    return text
+
+
+def _attr(attrs, name):
+    """Return the named attribute found in a raw start tag, or None"""
+    m = _ATTR_RES[name].search(attrs)
+    if not m:
+        return None
+    return html.unescape(next(group for group in m.groups() if group is not None))
+
+
+class TreeBlockReader:
+    """Read blocks from a parsed Markdown ElementTree"""
+
+    def __init__(self, md):
+        self.md = md
+        self.stash = md.htmlStash.rawHtmlBlocks
+
+    def _raw(self, key):
+        """Return stashed raw HTML with nested placeholders and ampersands resolved"""
+        raw = str(self.stash[key])
+        raw = util.HTML_PLACEHOLDER_RE.sub(lambda m: self._raw(int(m.group(1))), raw)
+        return raw.replace(util.AMP_SUBSTITUTE, '&')
+
+    def _raw_events(self, raw):
+        """Yield events for a fragment of raw HTML"""
+        pos = 0
+        for m in _RAW_TAG_RE.finditer(raw):
+            if m.start() > pos:
+                yield ('text', html.unescape(raw[pos:m.start()]))
+            pos = m.end()
+            if not m.group(2):
+                continue
+            tag = m.group(2).lower()
+            if m.group(1):
+                yield ('end', tag)
+            elif tag == 'img':
+                attrs = m.group(3)
+                yield ('image', _attr(attrs, 'src'), _attr(attrs, 'alt') or '')
+            else:
+                attrs = m.group(3)
+                yield ('start', tag, _attr(attrs, 'style') or '', _attr(attrs, 'href'))
+                if tag in _VOID_TAGS or m.group(3).rstrip().endswith('/'):
+                    yield ('end', tag)
+        if pos < len(raw):
+            yield ('text', html.unescape(raw[pos:]))
+
+    def _text_events(self, text):
+        """Yield events for element text that may contain raw HTML placeholders"""
+        pos = 0
+        for m in util.HTML_PLACEHOLDER_RE.finditer(text):
+            if m.start() > pos:
+                yield ('text', _decode_text(text[pos:m.start()]))
+            pos = m.end()
+            key = int(m.group(1))
+            if key < len(self.stash):
+                yield from self._raw_events(self._raw(key))
+            else:
+                yield ('text', m.group(0))
+        if pos < len(text):
+            yield ('text', _decode_text(text[pos:]))
+
+    def events(self, elem):
+        """Yield the inline content events of elem, as described in md_to_docx.inline"""
+        if elem.text:
+            yield from self._text_events(elem.text)
+        for child in elem:
+            if child.tag == 'img':
+                src = child.get('src')
+                yield ('image', _decode_text(src) if src is not None else None,
+                       _decode_text(child.get('alt', '')))
+                if child.tail:
+                    yield from self._text_events(child.tail)
+                continue
+            href = child.get('href')
+            if href is not None:
+                href = _decode_text(href)
+            yield ('start', child.tag, child.get('style', ''), href)
+            yield from self.events(child)
+            yield ('end', child.tag)
+            if child.tail:
+                yield from self._text_events(child.tail)
+
+    def text(self, elem):
+        """Return the decoded text content of elem"""
+        return ''.join(event[1] for event in self.events(elem) if event[0] == 'text')
+
+    def runs(self, elem):
+        """Return the coalesced inline runs of elem's content"""
+        return runs_from_events(self.events(elem))
+
+    def _block_html(self, elem):
+        """Return the raw HTML a paragraph stands in for, if it is a block placeholder"""
+        if len(elem) or not elem.text:
+            return None
+        m = util.HTML_PLACEHOLDER_RE.fullmatch(elem.text)
+        if not m or int(m.group(1)) >= len(self.stash):
+            return None
+        raw = self._raw(int(m.group(1)))
+        if not self.md.postprocessors['raw_html'].isblocklevel(raw):
+            return None
+        return raw
+
+    def _raw_blocks(self, raw):
+        """Yield blocks for a block-level raw HTML fragment"""
+        m = _FENCED_CODE_RE.match(raw)
+        if m:
+            language = code_language(_attr(m.group(1), 'class') or '')
+            yield ('pre', (html.unescape(m.group(2)), language))
+            return
+        # Hand-written HTML blocks are rare; parse just that fragment
+        from .soup import iter_html_blocks
+        yield from iter_html_blocks(raw)
+
+    def iter_blocks(self, root):
+        """Yield (tag, payload) blocks for the top-level elements of root"""
+        for elem in root:
+            tag = elem.tag
+            if tag == "p":
+                raw = self._block_html(elem)
+                if raw is not None:
+                    yield from self._raw_blocks(raw)
+                else:
+                    yield (tag, self.runs(elem))
+            elif tag in _HEADINGS:
+                yield (tag, self.runs(elem))
+            elif tag == "pre":
+                code = elem.find("code")
+                language = code_language(code.get("class", "")) if code is not None else None
+                yield (tag, (self.text(elem), language))
+            elif tag in ("ul", "ol"):
+                yield (tag, [self.runs(li) for li in elem if li.tag == "li"])
+            elif tag == "table":
+                rows = []
+                for tr in elem.iter("tr"):
+                    cells = []
+                    for cell in tr.iter():
+                        if cell.tag in ("th", "td"):
+                            cells.append((cell.tag, self.runs(cell)))
+                    rows.append(cells)
+                yield (tag, rows)
+
+
+def parse_tree(md, md_text):
+    """Run Markdown up to and including the tree processors and return the root"""
+    md.lines = md_text.split("\n")
+    for prep in md.preprocessors:
+        md.lines = prep.run(md.lines)
+    root = md.parser.parseDocument(md.lines).getroot()
+    for treeprocessor in md.treeprocessors:
+        new_root = treeprocessor.run(root)
+        if new_root is not None:
+            root = new_root
+    return root
+
+
+def _tree_blocks(md, root):
+    """Yield the blocks of a parsed tree, resetting md once they are consumed"""
+    try:
+        if root is not None:
+            yield from TreeBlockReader(md).iter_blocks(root)
+    finally:
+        md.reset()
+
+
+def iter_blocks(md, md_text, profiler=None):
+    """Yield blocks by walking the Markdown ElementTree directly
+
+    The tree is built before the first block is requested, so a profiler
+    can time it as the 'markdown' stage.
+    """
+    root = None
+    if md_text.strip():
+        with stage(profiler, 'markdown'):
+            try:
+                root = parse_tree(md, md_text)
+            except BaseException:
+                md.reset()
+                raise
+    return _tree_blocks(md, root)
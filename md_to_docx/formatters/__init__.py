@@ -1,14 +1,38 @@
 """
 Formatters for Word document elements
+
+Formatters are imported from their submodules on first access, so importing
+one formatter does not load the others.
 """
 
-from .table import set_cell_background, set_cell_margins, set_table_border, set_cell_border
-from .heading import apply_heading_format
+import importlib
+
+
+# Exported name -> submodule defining it
+_EXPORTS = {
+    'set_cell_background': 'table',
+    'set_cell_margins': 'table',
+    'set_table_border': 'table',
+    'set_cell_border': 'table',
+    'ensure_table_style': 'table',
+    'add_bulk_table': 'table',
+    'start_bulk_table': 'table',
+    'append_bulk_rows': 'table',
+    'apply_heading_format': 'heading',
+    'apply_config_styles': 'styles',
+    'runs_xml': 'runs',
+    'add_runs': 'runs',
+    'styled_runs_xml': 'runs',
+    'add_styled_runs': 'runs',
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = [
-    'set_cell_background',
-    'set_cell_margins',
-    'set_table_border',
-    'set_cell_border',
-    'apply_heading_format'
-]
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
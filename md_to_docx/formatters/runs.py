@@ -0,0 +1,142 @@
+"""
+Run XML for formatted inline text
+"""
+
+from functools import lru_cache
+from xml.sax.saxutils import escape as xml_escape
+
+from docx.oxml.ns import nsdecls
+from docx.oxml import parse_xml
+
+from .styles import INLINE_CODE_STYLE_ID, LINK_STYLE_ID, LINK_COLOR, TABLE_HEADER_STYLE_ID
+
+
+def _rpr_xml(style_id=None, font_name=None, bold=None, font_size=None, color=None, italic=None,
+             underline=None):
+    """Return a w:rPr fragment for the given run properties"""
+    parts = []
+    if style_id:
+        parts.append(f'<w:rStyle w:val="{style_id}"/>')
+    if font_name:
+        name = xml_escape(font_name, {'"': '&quot;'})
+        parts.append(f'<w:rFonts w:ascii="{name}" w:hAnsi="{name}" w:cs="{name}"/>')
+    if bold is not None:
+        parts.append('<w:b/>' if bold else '<w:b w:val="0"/>')
+    if italic is not None:
+        parts.append('<w:i/>' if italic else '<w:i w:val="0"/>')
+    if color:
+        parts.append(f'<w:color w:val="{color}"/>')
+    if font_size is not None:
+        half_points = int(round(font_size * 2))
+        parts.append(f'<w:sz w:val="{half_points}"/>')
+    if underline:
+        parts.append('<w:u w:val="single"/>')
+    if not parts:
+        return ''
+    return '<w:rPr>' + ''.join(parts) + '</w:rPr>'
+
+
+def _text_xml(text):
+    """Return run content for text, mapping tabs and line breaks like python-docx"""
+    text = xml_escape(text)
+    if '\t' in text or '\n' in text or '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+        text = (text.replace('\t', '</w:t><w:tab/><w:t xml:space="preserve">')
+                    .replace('\n', '</w:t><w:br/><w:t xml:space="preserve">'))
+    return f'<w:t xml:space="preserve">{text}</w:t>'
+
+
+@lru_cache(maxsize=1024)
+def _format_rpr(fmt, style_id, code_font=None):
+    """Return the w:rPr fragment for an InlineFormat on top of a character style
+
+    code_font is the font of inline code in table header cells.
+    """
+    color = fmt.color
+    if style_id == TABLE_HEADER_STYLE_ID:
+        # Header cells keep their bold, sized style, so code and links are
+        # formatted directly instead of with their own character styles
+        if fmt.link is not None and color is None:
+            color = LINK_COLOR
+        return _rpr_xml(
+            style_id=style_id,
+            font_name=code_font if fmt.code else None,
+            bold=True if fmt.bold else None,
+            italic=True if fmt.italic else None,
+            color=str(color) if color is not None else None,
+            underline=fmt.link is not None,
+        )
+    # A run has a single character style: code and links take precedence
+    if fmt.code:
+        style_id = INLINE_CODE_STYLE_ID
+    elif fmt.link is not None:
+        style_id = LINK_STYLE_ID
+    return _rpr_xml(
+        style_id=style_id,
+        bold=True if fmt.bold else None,
+        italic=True if fmt.italic else None,
+        color=str(color) if color is not None else None,
+    )
+
+
+def _field_instr(url):
+    """Return the escaped instruction of a HYPERLINK field"""
+    return xml_escape('HYPERLINK "' + url.replace('"', '%22') + '"', {'"': '&quot;'})
+
+
+def runs_xml(runs, style_id=None, image_xml=None, code_font=None):
+    """Return w:r elements for (text, InlineFormat) runs as an XML string
+
+    style_id is the character style of runs without code or link formatting,
+    and of every run in a table header cell, where inline code is set in
+    code_font. Consecutive runs with the same link are wrapped in one
+    HYPERLINK field, which needs no relationship part and so survives
+    streamed and merged document bodies. image_xml(src, alt) returns the
+    w:drawing of an image run, or None to fall back to its alt text; without
+    it images are always written as alt text.
+    """
+    parts = []
+    link = None
+    for text, fmt in runs:
+        if fmt.link != link:
+            if link is not None:
+                parts.append('</w:fldSimple>')
+            link = fmt.link
+            if link is not None:
+                parts.append(f'<w:fldSimple w:instr="{_field_instr(link)}">')
+        if fmt.image is not None:
+            drawing = image_xml(fmt.image, text) if image_xml is not None else None
+            if drawing is not None:
+                parts.append(f'<w:r>{_format_rpr(fmt, style_id, code_font)}{drawing}</w:r>')
+                continue
+            if not text:
+                continue
+        parts.append(f'<w:r>{_format_rpr(fmt, style_id, code_font)}{_text_xml(text)}</w:r>')
+    if link is not None:
+        parts.append('</w:fldSimple>')
+    return ''.join(parts)
+
+
+def styled_runs_xml(runs):
+    """Return w:r elements for (text, style_id) runs as an XML string
+
+    style_id is a character style ID, or None for a run without one.
+    """
+    return ''.join(f'<w:r>{_rpr_xml(style_id=style_id)}{_text_xml(text)}</w:r>'
+                   for text, style_id in runs)
+
+
+def add_runs(paragraph, runs, style_id=None, image_xml=None, code_font=None):
+    """Append (text, InlineFormat) runs to a python-docx paragraph, see runs_xml()"""
+    if not runs:
+        return
+    p = parse_xml(f'<w:p {nsdecls("w")}>{runs_xml(runs, style_id, image_xml, code_font)}</w:p>')
+    paragraph._p.extend(list(p))
+
+
+def add_styled_runs(paragraph, runs):
+    """Append (text, style_id) runs to a python-docx paragraph"""
+    if not runs:
+        return
+    p = parse_xml(f'<w:p {nsdecls("w")}>{styled_runs_xml(runs)}</w:p>')
+    paragraph._p.extend(list(p))
@@ -0,0 +1,238 @@
+"""
+Named Word styles compiled from the configuration
+"""
+
+from docx.shared import Pt, RGBColor
+from docx.enum.text import WD_UNDERLINE
+from docx.enum.style import WD_STYLE_TYPE
+from docx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import PackURI
+from docx.oxml.ns import nsdecls
+from docx.oxml import parse_xml
+from docx.parts.numbering import NumberingPart
+
+
+BODY_STYLE = 'Markdown Body'
+CODE_STYLE = 'Markdown Code'
+CODE_TABLE_STYLE = 'Markdown Code Block'
+LIST_BULLET_STYLE = 'Markdown List Bullet'
+LIST_NUMBER_STYLE = 'Markdown List Number'
+TABLE_HEADER_STYLE = 'Markdown Table Header'
+TABLE_DATA_STYLE = 'Markdown Table Data'
+INLINE_CODE_STYLE = 'Markdown Inline Code'
+LINK_STYLE = 'Markdown Link'
+
+# Style IDs are the style names without spaces, as python-docx generates them
+BODY_STYLE_ID = 'MarkdownBody'
+CODE_STYLE_ID = 'MarkdownCode'
+CODE_TABLE_STYLE_ID = 'MarkdownCodeBlock'
+LIST_BULLET_STYLE_ID = 'MarkdownListBullet'
+LIST_NUMBER_STYLE_ID = 'MarkdownListNumber'
+TABLE_HEADER_STYLE_ID = 'MarkdownTableHeader'
+TABLE_DATA_STYLE_ID = 'MarkdownTableData'
+INLINE_CODE_STYLE_ID = 'MarkdownInlineCode'
+LINK_STYLE_ID = 'MarkdownLink'
+
+# Word's default hyperlink colour
+LINK_COLOR = RGBColor(0x05, 0x63, 0xC1)
+
+# Font sizes in points of the headings added to templates that lack them
+_FALLBACK_HEADING_SIZES = {1: 16, 2: 13, 3: 12, 4: 11, 5: 11, 6: 11}
+
+# Built-in list styles and the numbering format and level text of the
+# fallbacks added to templates that lack them
+_FALLBACK_LISTS = {
+    'List Bullet': ('bullet', '\u2022'),
+    'List Number': ('decimal', '%1.'),
+}
+
+
+def heading_style_id(heading_name):
+    """Return the style ID used for a configured heading such as 'h2'"""
+    return f'MarkdownHeading{heading_name[1:]}'
+
+
+def code_token_style_name(category):
+    """Return the character style name of a highlighted code token category such as 'keyword'"""
+    return f'Markdown Code {category.capitalize()}'
+
+
+def code_token_style_id(category):
+    """Return the character style ID of a highlighted code token category"""
+    return code_token_style_name(category).replace(' ', '')
+
+
+def _set_font(font, spec):
+    """Apply a compiled FontSpec onto a style font"""
+    font.name = spec.name
+    font.size = spec.size
+    font.bold = spec.bold
+    font.italic = spec.italic
+    if spec.color is not None:
+        font.color.rgb = spec.color
+
+
+def _add_style(styles, name, style_type, base_name=None):
+    """Add a style, replacing nothing if one with the same name exists"""
+    if name in styles:
+        return styles[name]
+    style = styles.add_style(name, style_type)
+    # Reference templates may lack the base style
+    if base_name is not None and base_name in styles:
+        style.base_style = styles[base_name]
+    return style
+
+
+def _ensure_heading_style(styles, level):
+    """Add the built-in 'Heading N' style for a level if the template lacks it
+
+    Templates made in Word only contain the headings used in them, and
+    unconfigured Markdown headings are rendered with these styles.
+    """
+    name = f'Heading {level}'
+    if name in styles:
+        return
+    style = _add_style(styles, name, WD_STYLE_TYPE.PARAGRAPH, 'Normal')
+    if 'Normal' in styles:
+        style.next_paragraph_style = styles['Normal']
+    style.font.bold = True
+    style.font.size = Pt(_FALLBACK_HEADING_SIZES[level])
+    style.paragraph_format.keep_with_next = True
+    style.paragraph_format.space_before = Pt(12)
+    # The outline level makes it a heading for navigation and tables of contents
+    style.element.get_or_add_pPr().append(
+        parse_xml(f'<w:outlineLvl {nsdecls("w")} w:val="{level - 1}"/>')
+    )
+
+
+def _numbering(doc):
+    """Return the w:numbering element of doc, adding a numbering part if it has none"""
+    document_part = doc.part
+    try:
+        return document_part.numbering_part.element
+    except NotImplementedError:
+        # python-docx cannot create a numbering part itself
+        part = NumberingPart.load(PackURI('/word/numbering.xml'), CT.WML_NUMBERING,
+                                  f'<w:numbering {nsdecls("w")}/>'.encode('utf-8'), document_part.package)
+        document_part.relate_to(part, RT.NUMBERING)
+        return part.element
+
+
+def _ensure_list_style(doc, name):
+    """Add a built-in list style with its own single-level numbering if the template lacks it"""
+    styles = doc.styles
+    if name in styles:
+        return
+    num_format, level_text = _FALLBACK_LISTS[name]
+    numbering = _numbering(doc)
+    abstract_id = max((int(value) for value in numbering.xpath('./w:abstractNum/@w:abstractNumId')),
+                      default=-1) + 1
+    abstract = parse_xml(
+        f'<w:abstractNum {nsdecls("w")} w:abstractNumId="{abstract_id}">'
+        '<w:multiLevelType w:val="singleLevel"/>'
+        f'<w:lvl w:ilvl="0"><w:start w:val="1"/><w:numFmt w:val="{num_format}"/>'
+        f'<w:lvlText w:val="{level_text}"/><w:lvlJc w:val="left"/>'
+        '<w:pPr><w:ind w:left="360" w:hanging="360"/></w:pPr></w:lvl>'
+        '</w:abstractNum>'
+    )
+    # Abstract numbering definitions precede the w:num instances
+    nums = numbering.num_lst
+    if nums:
+        nums[0].addprevious(abstract)
+    else:
+        numbering.append(abstract)
+    num = numbering.add_num(abstract_id)
+
+    style = _add_style(styles, name, WD_STYLE_TYPE.PARAGRAPH, 'Normal')
+    style.element.get_or_add_pPr().get_or_add_numPr().get_or_add_numId().val = num.numId
+
+
+def _add_code_table_style(doc, codeblock):
+    """Add the table style for code blocks: border, shading and cell margins"""
+    styles = doc.styles.element
+    if styles.get_by_id(CODE_TABLE_STYLE_ID) is not None:
+        return
+    margin = codeblock.cell_margin.twips
+    borders = ''.join(
+        f'<w:{name} w:val="single" w:sz="8" w:space="0" w:color="000000"/>'
+        for name in ['top', 'left', 'bottom', 'right', 'insideH', 'insideV']
+    )
+    margins = ''.join(
+        f'<w:{name} w:w="{margin}" w:type="dxa"/>'
+        for name in ['top', 'left', 'bottom', 'right']
+    )
+    styles.append(parse_xml(
+        f'<w:style {nsdecls("w")} w:type="table" w:customStyle="1" w:styleId="{CODE_TABLE_STYLE_ID}">'
+        f'<w:name w:val="{CODE_TABLE_STYLE}"/>'
+        '<w:basedOn w:val="TableNormal"/>'
+        f'<w:tblPr><w:tblBorders>{borders}</w:tblBorders><w:tblCellMar>{margins}</w:tblCellMar></w:tblPr>'
+        f'<w:tcPr><w:shd w:val="clear" w:color="auto" w:fill="{codeblock.background_color}"/></w:tcPr>'
+        '</w:style>'
+    ))
+
+
+def apply_config_styles(doc, config):
+    """Create the named paragraph, character and table styles for a CompiledConfig
+
+    Rendering then only references style IDs instead of repeating direct
+    formatting on every paragraph and run. Call once per document.
+    """
+    styles = doc.styles
+
+    # Built-in styles the renderers rely on, in case the template lacks them
+    for level in range(1, 7):
+        _ensure_heading_style(styles, level)
+    for name in _FALLBACK_LISTS:
+        _ensure_list_style(doc, name)
+
+    # Body paragraphs
+    body = _add_style(styles, BODY_STYLE, WD_STYLE_TYPE.PARAGRAPH, 'Normal')
+    _set_font(body.font, config.paragraph.font)
+    body.paragraph_format.space_before = config.paragraph.space_before
+    body.paragraph_format.space_after = config.paragraph.space_after
+    body.paragraph_format.line_spacing = config.paragraph.line_spacing
+
+    # Configured headings
+    for heading_name, heading_spec in config.headings.items():
+        heading = _add_style(styles, f'Markdown Heading {heading_name[1:]}',
+                             WD_STYLE_TYPE.PARAGRAPH, 'Normal')
+        _set_font(heading.font, heading_spec.font)
+        heading.paragraph_format.space_before = heading_spec.space_before
+        heading.paragraph_format.space_after = heading_spec.space_after
+
+    # Code blocks
+    code = _add_style(styles, CODE_STYLE, WD_STYLE_TYPE.PARAGRAPH, 'Normal')
+    code.font.name = config.codeblock.font.name
+    code.font.size = config.codeblock.font.size
+    code.paragraph_format.space_before = Pt(0)
+    code.paragraph_format.space_after = Pt(0)
+    code.paragraph_format.line_spacing = config.codeblock.line_spacing
+    _add_code_table_style(doc, config.codeblock)
+
+    # Highlighted code tokens
+    if config.codeblock.highlight:
+        for category, token_spec in config.codeblock.tokens:
+            token = _add_style(styles, code_token_style_name(category), WD_STYLE_TYPE.CHARACTER)
+            token.font.bold = token_spec.bold
+            token.font.italic = token_spec.italic
+            if token_spec.color is not None:
+                token.font.color.rgb = token_spec.color
+
+    # Lists keep the template's list formatting
+    _add_style(styles, LIST_BULLET_STYLE, WD_STYLE_TYPE.PARAGRAPH, 'List Bullet')
+    _add_style(styles, LIST_NUMBER_STYLE, WD_STYLE_TYPE.PARAGRAPH, 'List Number')
+
+    # Table cell text
+    header = _add_style(styles, TABLE_HEADER_STYLE, WD_STYLE_TYPE.CHARACTER)
+    header.font.name = config.table.header_font.name
+    header.font.size = config.table.header_font.size
+    header.font.bold = config.table.header_font.bold
+    data = _add_style(styles, TABLE_DATA_STYLE, WD_STYLE_TYPE.CHARACTER)
+    data.font.name = config.table.data_font_name
+
+    # Inline code and links
+    inline_code = _add_style(styles, INLINE_CODE_STYLE, WD_STYLE_TYPE.CHARACTER)
+    inline_code.font.name = config.codeblock.font.name
+    link = _add_style(styles, LINK_STYLE, WD_STYLE_TYPE.CHARACTER)
+    link.font.color.rgb = LINK_COLOR
+    link.font.underline = WD_UNDERLINE.SINGLE
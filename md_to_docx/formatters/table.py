@@ -2,9 +2,12 @@
 Table formatting functions for Word documents
 """
 
-from docx.shared import Mm
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
+from docx.shared import Emu
+from docx.oxml.ns import qn, nsdecls
+from docx.oxml import OxmlElement, parse_xml
+
+from .styles import TABLE_HEADER_STYLE_ID, TABLE_DATA_STYLE_ID
+from .runs import runs_xml
 
 
 def set_cell_background(cell, color):
@@ -64,3 +67,125 @@ def set_cell_border(cell, borders):
         tcBorders.append(border)
     
     tcPr.append(tcBorders)
+
+
+TABLE_STYLE_ID = 'MarkdownTable'
+
+_BORDER = '<w:{0} w:val="single" w:sz="8" w:space="0" w:color="000000"/>'
+_NO_BORDER = '<w:{0} w:val="nil"/>'
+# Rows parsed per lxml call when building bulk tables
+ROW_CHUNK = 500
+
+_VERTICAL_ALIGNMENTS = {'top': 'top', 'center': 'center', 'bottom': 'bottom'}
+
+
+def ensure_table_style(doc, vertical_alignment='bottom'):
+    """Add the shared table style for bulk tables to the document once
+
+    The style carries the borders, header vertical alignment and zero
+    paragraph spacing that the per-cell path sets on every cell.
+    """
+    styles = doc.styles.element
+    if styles.get_by_id(TABLE_STYLE_ID) is not None:
+        return TABLE_STYLE_ID
+
+    alignment = _VERTICAL_ALIGNMENTS.get(vertical_alignment.lower(), 'bottom')
+    table_borders = ''.join([
+        _NO_BORDER.format('top'),
+        _BORDER.format('left'),
+        _BORDER.format('bottom'),
+        _BORDER.format('right'),
+        _BORDER.format('insideH'),
+        _BORDER.format('insideV'),
+    ])
+    header_borders = ''.join([
+        _NO_BORDER.format('top'),
+        _NO_BORDER.format('left'),
+        _BORDER.format('bottom'),
+        _NO_BORDER.format('right'),
+        _NO_BORDER.format('insideV'),
+    ])
+    style = parse_xml(
+        f'<w:style {nsdecls("w")} w:type="table" w:customStyle="1" w:styleId="{TABLE_STYLE_ID}">'
+        '<w:name w:val="Markdown Table"/>'
+        '<w:basedOn w:val="TableNormal"/>'
+        '<w:pPr><w:spacing w:after="0"/></w:pPr>'
+        f'<w:tblPr><w:tblBorders>{table_borders}</w:tblBorders></w:tblPr>'
+        '<w:tblStylePr w:type="firstRow">'
+        f'<w:tcPr><w:tcBorders>{header_borders}</w:tcBorders><w:vAlign w:val="{alignment}"/></w:tcPr>'
+        '</w:tblStylePr>'
+        '</w:style>'
+    )
+    styles.append(style)
+    return TABLE_STYLE_ID
+
+
+def _append_rows(tbl, parts):
+    """Parse a chunk of w:tr markup and append the rows to tbl"""
+    chunk = parse_xml(f'<w:tbl {nsdecls("w")}>' + ''.join(parts) + '</w:tbl>')
+    tbl.extend(list(chunk))
+
+
+def start_bulk_table(doc, max_cols, vertical_alignment='bottom'):
+    """Append an empty bulk table with max_cols equal columns and return its w:tbl element
+
+    Rows are added with append_bulk_rows().
+    """
+    style_id = ensure_table_style(doc, vertical_alignment)
+    width_twips = Emu(doc._block_width // max_cols).twips
+    tbl = parse_xml(
+        f'<w:tbl {nsdecls("w")}>'
+        f'<w:tblPr><w:tblStyle w:val="{style_id}"/><w:tblW w:type="auto" w:w="0"/>'
+        '<w:tblLook w:firstColumn="0" w:firstRow="1" w:lastColumn="0" w:lastRow="0"'
+        ' w:noHBand="1" w:noVBand="1" w:val="0620"/></w:tblPr>'
+        '<w:tblGrid>' + f'<w:gridCol w:w="{width_twips}"/>' * max_cols + '</w:tblGrid>'
+        '</w:tbl>'
+    )
+    # Insert the empty table first: moving one huge parsed subtree into the
+    # document is far slower in lxml than appending rows in modest chunks
+    doc.element.body._insert_tbl(tbl)
+    return tbl
+
+
+def append_bulk_rows(tbl, rows, image_xml=None, code_font=None):
+    """Append rows to a table from start_bulk_table()
+
+    Each row is a list of (is_header, runs) cells where runs is a list of
+    (text, InlineFormat) pairs; rows are cut or padded to the table's
+    columns. image_xml and code_font are passed on to runs_xml().
+    """
+    grid = tbl.find(qn('w:tblGrid'))
+    max_cols = len(grid)
+    width_twips = grid[0].get(qn('w:w'))
+
+    cell_open = f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width_twips}"/></w:tcPr><w:p>'
+    empty_cell = cell_open + '</w:p></w:tc>'
+
+    parts = []
+    for row_count, cells in enumerate(rows, 1):
+        parts.append('<w:tr>')
+        for is_header, runs in cells[:max_cols]:
+            parts.append(cell_open)
+            parts.append(runs_xml(runs, TABLE_HEADER_STYLE_ID if is_header else TABLE_DATA_STYLE_ID,
+                                  image_xml, code_font))
+            parts.append('</w:p></w:tc>')
+        if len(cells) < max_cols:
+            parts.append(empty_cell * (max_cols - len(cells)))
+        parts.append('</w:tr>')
+        if row_count % ROW_CHUNK == 0:
+            _append_rows(tbl, parts)
+            parts = []
+    if parts:
+        _append_rows(tbl, parts)
+
+
+def add_bulk_table(doc, rows, max_cols, vertical_alignment='bottom', image_xml=None, code_font=None):
+    """Append a table built in one pass from a pre-extracted row matrix
+
+    Each row is a list of (is_header, runs) cells, see append_bulk_rows().
+    Borders and header cell alignment come from the shared table style and
+    runs reference the table header and data character styles.
+    """
+    tbl = start_bulk_table(doc, max_cols, vertical_alignment)
+    append_bulk_rows(tbl, rows, image_xml, code_font)
+    return tbl
@@ -0,0 +1,100 @@
+"""
+Syntax highlighting of code blocks with Pygments
+
+Pygments is optional and only imported when a code block is highlighted.
+Without it, and for blocks without a known language or above the configured
+size limit, code blocks are written as plain text.
+
+Lexers are created once per language and process. Token types map to the
+character styles of the configured token categories through a table built
+once per config, and consecutive tokens with the same style are merged into
+one run, so a block costs one lexer pass and a dict lookup per token.
+"""
+
+from functools import lru_cache
+
+from .config import CODE_TOKEN_TYPES
+from .formatters.styles import code_token_style_id
+
+
+# Lexers keyed by language name; None for languages Pygments does not know
+_lexers = {}
+
+
+def get_lexer(language):
+    """Return the cached Pygments lexer for a language name, or None"""
+    try:
+        return _lexers[language]
+    except KeyError:
+        pass
+    try:
+        from pygments.lexers import get_lexer_by_name
+        from pygments.util import ClassNotFound
+    except ImportError:
+        lexer = None
+    else:
+        try:
+            # Keep the text as given, so run text matches the unhighlighted block
+            lexer = get_lexer_by_name(language, stripnl=False, ensurenl=False)
+        except ClassNotFound:
+            lexer = None
+    _lexers[language] = lexer
+    return lexer
+
+
+def _token_style(ttype, categories):
+    """Return the style ID of the most specific category covering a token type, or None"""
+    while ttype is not None:
+        style_id = categories.get(ttype)
+        if style_id is not None:
+            return style_id
+        ttype = ttype.parent
+    return None
+
+
+@lru_cache(maxsize=8)
+def style_table(tokens):
+    """Return (table, categories) for the token categories of a CodeBlockSpec
+
+    tokens is the (category, TokenSpec) tuple of the spec. table maps every
+    standard Pygments token type to a character style ID or None, and
+    categories maps the configured token types to their style IDs;
+    highlight_runs() adds the custom token types of some lexers to table as
+    it meets them.
+    """
+    from pygments.token import STANDARD_TYPES, string_to_tokentype
+    categories = {
+        string_to_tokentype(CODE_TOKEN_TYPES[category]): code_token_style_id(category)
+        for category, _ in tokens
+    }
+    return {ttype: _token_style(ttype, categories) for ttype in STANDARD_TYPES}, categories
+
+
+def highlight_runs(code_text, language, codeblock):
+    """Return highlighted code as (text, style_id) runs, or None to write it plain
+
+    codeblock is the CodeBlockSpec of the compiled config.
+    """
+    if not codeblock.highlight or not language or len(code_text) > codeblock.highlight_max_chars:
+        return None
+    lexer = get_lexer(language)
+    if lexer is None:
+        return None
+    table, categories = style_table(codeblock.tokens)
+
+    runs = []
+    parts = []
+    current = None
+    for ttype, value in lexer.get_tokens(code_text):
+        try:
+            style_id = table[ttype]
+        except KeyError:
+            style_id = table[ttype] = _token_style(ttype, categories)
+        if style_id != current and parts:
+            runs.append((''.join(parts), current))
+            parts = []
+        current = style_id
+        parts.append(value)
+    if parts:
+        runs.append((''.join(parts), current))
+    return runs
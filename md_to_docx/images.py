@@ -0,0 +1,339 @@
+"""
+Embedded images: header-only size probing, concurrent reads and deduplication
+
+Recently used image files are kept in a small cache while they are
+unchanged, so files shared by many documents are read once, and their
+pixel size and resolution are taken from the PNG, JPEG or GIF header
+without decoding the image. Each document stores every distinct
+image once, keyed by the SHA-1 of its bytes like python-docx, and every
+occurrence references that one media part.
+
+Before rendering, the image references in the Markdown text are submitted
+to a shared thread pool so the files are read concurrently; rendering then
+only waits for files it reaches before they are loaded.
+"""
+
+import os
+import re
+import struct
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+from xml.sax.saxutils import escape as xml_escape
+
+from docx.oxml.ns import nsdecls
+from docx.parts.image import ImagePart
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+
+
+# A loaded image; width and height are in pixels, dpi is (horizontal, vertical)
+ImageInfo = namedtuple('ImageInfo', 'blob sha1 content_type ext width height dpi')
+
+# Resolution assumed when the header records none, as in python-docx
+DEFAULT_DPI = 72
+
+EMU_PER_INCH = 914400
+
+# Threads reading image files; reads are I/O bound so this exceeds the core count
+READ_WORKERS = 8
+
+_MARKDOWN_IMAGE_RE = re.compile(r'!\[[^\]]*\]\(\s*<?([^)\s>]+)')
+_HTML_IMAGE_RE = re.compile(r'''<img\b[^>]*?\bsrc\s*=\s*["']?([^"'\s>]+)''', re.I)
+_URL_SCHEME_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*:')
+
+# JPEG start-of-frame markers carrying the image size (not DHT, JPG or DAC)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Bytes of image data kept in the file cache; long-lived processes such as
+# batch workers, the service and watch mode see an unbounded set of files
+FILE_CACHE_BYTES = 64 << 20
+
+# Loaded images keyed by absolute path, least recently used first:
+# ((mtime_ns, size), ImageInfo)
+_file_cache = OrderedDict()
+_file_cache_bytes = 0
+# Files are loaded on the read pool's threads
+_file_cache_lock = threading.Lock()
+
+_executor = None
+
+
+def _png_info(blob):
+    """Return (width, height, dpi) from the IHDR and pHYs chunks of a PNG"""
+    width, height = struct.unpack('>II', blob[16:24])
+    dpi = (DEFAULT_DPI, DEFAULT_DPI)
+    pos = 8
+    # Walk chunk headers only, stopping at the image data
+    while pos + 8 <= len(blob):
+        length, chunk_type = struct.unpack('>I4s', blob[pos:pos + 8])
+        if chunk_type == b'IDAT':
+            break
+        if chunk_type == b'pHYs' and length >= 9:
+            x, y, unit = struct.unpack('>IIB', blob[pos + 8:pos + 17])
+            if unit == 1 and x and y:
+                # Pixels per metre
+                dpi = (int(round(x * 0.0254)), int(round(y * 0.0254)))
+            break
+        pos += length + 12
+    return width, height, dpi
+
+
+def _gif_info(blob):
+    """Return (width, height, dpi) from the logical screen descriptor of a GIF"""
+    width, height = struct.unpack('<HH', blob[6:10])
+    return width, height, (DEFAULT_DPI, DEFAULT_DPI)
+
+
+def _jpeg_info(blob):
+    """Return (width, height, dpi) from the JFIF and start-of-frame segments of a JPEG"""
+    dpi = (DEFAULT_DPI, DEFAULT_DPI)
+    pos = 2
+    while pos + 4 <= len(blob):
+        if blob[pos] != 0xFF:
+            raise ValueError('corrupt JPEG segment')
+        marker = blob[pos + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            pos += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        length = struct.unpack('>H', blob[pos + 2:pos + 4])[0]
+        segment = blob[pos + 4:pos + 2 + length]
+        if marker == 0xE0 and segment[:5] == b'JFIF\x00' and len(segment) >= 12:
+            unit, x, y = struct.unpack('>BHH', segment[7:12])
+            if x and y:
+                if unit == 1:
+                    dpi = (x, y)
+                elif unit == 2:
+                    # Dots per centimetre
+                    dpi = (int(round(x * 2.54)), int(round(y * 2.54)))
+        elif marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>HH', segment[1:5])
+            return width, height, dpi
+        elif marker == 0xDA:
+            break
+        pos += 2 + length
+    raise ValueError('no JPEG frame header found')
+
+
+def probe_image(blob):
+    """Return (content_type, ext, width, height, dpi) from an image header, or None
+
+    Only PNG, JPEG and GIF are recognized. Just the header bytes are read;
+    the image data is never decoded.
+    """
+    try:
+        if blob[:8] == b'\x89PNG\r\n\x1a\n':
+            return ('image/png', 'png') + _png_info(blob)
+        if blob[:3] == b'\xff\xd8\xff':
+            return ('image/jpeg', 'jpg') + _jpeg_info(blob)
+        if blob[:6] in (b'GIF87a', b'GIF89a'):
+            return ('image/gif', 'gif') + _gif_info(blob)
+    except (struct.error, ValueError, IndexError):
+        return None
+    return None
+
+
+def file_key(path):
+    """Return (mtime_ns, size) identifying the current version of a file, or None if missing"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def files_changed(files):
+    """Return whether any file in a path -> file_key() mapping has changed"""
+    return any(file_key(path) != key for path, key in files.items())
+
+
+def load_image(path):
+    """Return the ImageInfo of an image file, or None if it is missing or unsupported
+
+    Results are cached per path until the file's modification time or size
+    changes or the file is evicted from the cache.
+    """
+    key = file_key(path)
+    if key is None:
+        return None
+    with _file_cache_lock:
+        cached = _file_cache.get(path)
+        if cached is not None and cached[0] == key:
+            _file_cache.move_to_end(path)
+            return cached[1]
+    try:
+        with open(path, 'rb') as f:
+            blob = f.read()
+    except OSError:
+        return None
+    probed = probe_image(blob)
+    info = None
+    if probed is not None:
+        content_type, ext, width, height, dpi = probed
+        info = ImageInfo(blob, hashlib.sha1(blob).hexdigest(), content_type, ext, width, height, dpi)
+    _cache_file(path, key, info)
+    return info
+
+
+def _cache_file(path, key, info):
+    """Add a loaded image to the cache, evicting the least recently used beyond FILE_CACHE_BYTES"""
+    global _file_cache_bytes
+    # Unsupported files are rare and simply read again
+    if info is None or len(info.blob) > FILE_CACHE_BYTES:
+        return
+    with _file_cache_lock:
+        previous = _file_cache.pop(path, None)
+        if previous is not None:
+            _file_cache_bytes -= len(previous[1].blob)
+        _file_cache[path] = (key, info)
+        _file_cache_bytes += len(info.blob)
+        while _file_cache_bytes > FILE_CACHE_BYTES:
+            _, (_, evicted) = _file_cache.popitem(last=False)
+            _file_cache_bytes -= len(evicted.blob)
+
+
+def _pool():
+    """Return the shared thread pool for image reads, starting it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=READ_WORKERS, thread_name_prefix='md-to-docx-image')
+    return _executor
+
+
+def image_sources(md_text):
+    """Return the image sources referenced inline in Markdown text, in order"""
+    if 'img' not in md_text and '![' not in md_text:
+        return []
+    return _MARKDOWN_IMAGE_RE.findall(md_text) + _HTML_IMAGE_RE.findall(md_text)
+
+
+def get_or_add_image_part(package, sha1, blob, content_type, ext, parts=None):
+    """Return the package's image part for the given image bytes, adding it once
+
+    parts is an optional dict of sha1 -> ImagePart that saves rescanning
+    (and rehashing) the package's image parts for every occurrence.
+    """
+    if parts is not None and sha1 in parts:
+        return parts[sha1]
+    image_parts = package.image_parts
+    part = image_parts._get_by_sha1(sha1)
+    if part is None:
+        part = ImagePart(image_parts._next_image_partname(ext), content_type, blob)
+        image_parts.append(part)
+    if parts is not None:
+        parts[sha1] = part
+    return part
+
+
+def drawing_xml(rId, shape_id, cx, cy, name, descr=''):
+    """Return a w:drawing element holding an inline picture as an XML string"""
+    name = xml_escape(name, {'"': '&quot;'})
+    descr = xml_escape(descr, {'"': '&quot;'})
+    return (
+        f'<w:drawing {nsdecls("wp", "a", "pic", "r")}>'
+        '<wp:inline distT="0" distB="0" distL="0" distR="0">'
+        f'<wp:extent cx="{cx}" cy="{cy}"/>'
+        f'<wp:docPr id="{shape_id}" name="Picture {shape_id}" descr="{descr}"/>'
+        '<wp:cNvGraphicFramePr><a:graphicFrameLocks noChangeAspect="1"/></wp:cNvGraphicFramePr>'
+        '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+        f'<pic:pic><pic:nvPicPr><pic:cNvPr id="0" name="{name}"/><pic:cNvPicPr/></pic:nvPicPr>'
+        f'<pic:blipFill><a:blip r:embed="{rId}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+        f'<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+        '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></pic:spPr></pic:pic>'
+        '</a:graphicData></a:graphic></wp:inline></w:drawing>'
+    )
+
+
+def _is_within(root, path):
+    """Return whether an absolute path is root or below it"""
+    try:
+        return os.path.commonpath([root, path]) == root
+    except ValueError:
+        # Paths on different drives
+        return False
+
+
+class ImageLoader:
+    """Resolve, load and embed the images of one document
+
+    Relative sources resolve against base_dir, or the current directory when
+    it is None. Sources with a URL scheme other than file: are not fetched;
+    they and unreadable files fall back to their alt text. root limits the
+    local files that are read: None allows any, False none, and a directory
+    only the files below it, symbolic links resolved.
+    """
+
+    def __init__(self, doc, base_dir=None, root=None):
+        self.doc = doc
+        self.base_dir = base_dir
+        self.root = root if not root else os.path.realpath(root)
+        # Image files this document depends on: absolute path -> file_key()
+        self.files = {}
+        self._futures = {}
+        self._parts = {}
+        self._next_id = None
+
+    def resolve(self, src):
+        """Return the absolute path an image source refers to, or None"""
+        if not src:
+            return None
+        if src.startswith('file://'):
+            src = unquote(src[len('file://'):])
+        elif _URL_SCHEME_RE.match(src) and not os.path.splitdrive(src)[0]:
+            return None
+        if self.root is False:
+            return None
+        path = os.path.join(self.base_dir or os.getcwd(), src)
+        if not os.path.exists(path):
+            path = os.path.join(self.base_dir or os.getcwd(), unquote(src))
+        path = os.path.abspath(path)
+        if self.root is not None and not _is_within(self.root, os.path.realpath(path)):
+            return None
+        return path
+
+    def prefetch(self, md_text):
+        """Start reading the images referenced in md_text on the shared thread pool"""
+        for src in image_sources(md_text):
+            path = self.resolve(src)
+            if path is not None and path not in self._futures:
+                self._futures[path] = _pool().submit(load_image, path)
+
+    def load(self, src):
+        """Return the ImageInfo for an image source, or None"""
+        path = self.resolve(src)
+        if path is None:
+            return None
+        future = self._futures.get(path)
+        info = future.result() if future is not None else load_image(path)
+        # Missing files are recorded too, so caches notice when they appear
+        self.files[path] = file_key(path)
+        return info
+
+    def xml(self, src, alt=''):
+        """Return the w:drawing XML for an image source, or None if it cannot be embedded"""
+        info = self.load(src)
+        if info is None:
+            return None
+        doc = self.doc
+        part = get_or_add_image_part(doc.part.package, info.sha1, info.blob, info.content_type,
+                                     info.ext, self._parts)
+        rId = doc.part.relate_to(part, RT.IMAGE)
+
+        # Native size from the recorded resolution, scaled down to fit the text width
+        cx = info.width * EMU_PER_INCH // (info.dpi[0] or DEFAULT_DPI)
+        cy = info.height * EMU_PER_INCH // (info.dpi[1] or DEFAULT_DPI)
+        max_cx = doc._block_width
+        if cx > max_cx:
+            cy = cy * max_cx // cx
+            cx = max_cx
+
+        if self._next_id is None:
+            self._next_id = doc.part.next_id
+        shape_id = self._next_id
+        self._next_id += 1
+        return drawing_xml(rId, shape_id, cx, cy, os.path.basename(src), alt)
@@ -0,0 +1,198 @@
+"""
+Block-level incremental re-rendering for watch mode
+
+The Markdown is split into top-level blocks at the same safe boundaries the
+streaming converter uses. Each block's rendered body XML is cached under a
+hash of its text and the effective settings, so after an edit only the
+changed blocks are rendered again and the rest is reassembled from cache.
+Blocks with images are also rendered again when one of their image files
+changes.
+
+Reference-style link definitions are collected from the whole document and
+appended to every block, as for parallel rendering, so links resolve as in
+a full conversion. A block's key covers the definitions whose labels it
+mentions, so editing a definition re-renders the blocks that use it.
+"""
+
+import os
+import json
+import zlib
+import time
+import hashlib
+
+from .streaming import (
+    StreamingDocxWriter,
+    iter_markdown_chunks,
+    body_xml,
+    fragment_rels,
+    reference_definitions,
+    _REFERENCE_RE
+)
+from .template import _clear_body, _template_key
+from .images import files_changed
+from .utils import temp_file_beside
+
+
+# Watch output is rewritten on every save, so favour speed over size
+WATCH_COMPRESSLEVEL = zlib.Z_BEST_SPEED
+
+
+def settings_key(converter):
+    """Return bytes identifying everything besides the text that affects a converter's output"""
+    return json.dumps(
+        [converter.config, converter.engine, _template_key(converter.template)],
+        sort_keys=True, default=str
+    ).encode('utf-8')
+
+
+def _fold(text):
+    """Return text lowercased with whitespace collapsed, as Markdown compares link labels"""
+    return ' '.join(text.lower().split())
+
+
+def reference_entries(definitions):
+    """Return (folded label, text) for each definition from reference_definitions()
+
+    text is the definition with its continuation line, if any.
+    """
+    entries = []
+    for line in definitions:
+        m = _REFERENCE_RE.match(line)
+        if m:
+            entries.append([_fold(m.group(1)), line])
+        elif entries:
+            entries[-1][1] += '\n' + line
+    return [tuple(entry) for entry in entries]
+
+
+class IncrementalRenderer:
+    """Render Markdown documents, reusing the fragments of unchanged blocks"""
+
+    def __init__(self, converter, base_dir=None):
+        self.converter = converter
+        # Relative image paths resolve against base_dir, or the current directory
+        self.base_dir = base_dir
+        self._fragments = {}
+        self._scratch = None
+        self._scratch_rids = None
+        self._settings = None
+        self.rendered = 0
+        self.reused = 0
+
+    def _block_key(self, settings, block, references):
+        """Return the cache key of a block rendered with the given settings key and reference entries
+
+        Only the definitions whose labels appear in the block are part of
+        the key; the others cannot change how it renders.
+        """
+        digest = hashlib.blake2b(settings, digest_size=16)
+        digest.update(block.encode('utf-8'))
+        if references:
+            folded = _fold(block)
+            for label, text in references:
+                if label in folded:
+                    digest.update(b'\0' + text.encode('utf-8'))
+        return digest.digest()
+
+    def render(self, md_text):
+        """Return the (fragment, rels) of md_text's blocks, rendering only uncached blocks"""
+        settings = settings_key(self.converter)
+        if settings != self._settings:
+            # Config, engine or template changed: nothing cached is valid
+            self._settings = settings
+            self._fragments = {}
+            self._scratch = None
+
+        lines = md_text.splitlines()
+        definitions = reference_definitions(lines)
+        references = reference_entries(definitions)
+        suffix = '\n\n' + '\n'.join(definitions) if definitions else ''
+
+        fragments = []
+        current = {}
+        for block in iter_markdown_chunks(lines, 0):
+            key = self._block_key(settings, block, references)
+            rendered = current.get(key)
+            if rendered is None:
+                rendered = self._fragments.get(key)
+                if rendered is not None and rendered[2] and files_changed(rendered[2]):
+                    rendered = None
+            if rendered is None:
+                rendered = self._render_block(block + suffix)
+                self.rendered += 1
+            else:
+                self.reused += 1
+            current[key] = rendered
+            fragments.append(rendered[:2])
+
+        # Only keep the blocks of the latest version
+        self._fragments = current
+        return fragments
+
+    def _render_block(self, block):
+        """Render one block into the reusable scratch document
+
+        Returns (fragment, rels, files): its XML, the relationships it
+        references and the image files it depends on.
+        """
+        if self._scratch is None:
+            self._scratch = self.converter.new_document()
+            self._scratch_rids = frozenset(self._scratch.part.rels)
+        files = self.converter.render_into(self._scratch, block, self.base_dir)
+        xml = body_xml(self._scratch)
+        rels = fragment_rels(self._scratch, xml, self._scratch_rids)
+        _clear_body(self._scratch)
+        return xml, rels, files
+
+    def write(self, md_text, output):
+        """Render md_text and write the DOCX to output, a path or binary file object"""
+        fragments = self.render(md_text)
+        # A fresh base each time, so images of removed blocks are not kept
+        base = self.converter.new_document()
+        with StreamingDocxWriter(base, output, compresslevel=WATCH_COMPRESSLEVEL) as writer:
+            for fragment, rels in fragments:
+                writer.write(fragment, rels)
+
+    def save(self, md_text, output_docx):
+        """Write the DOCX next to output_docx and move it into place atomically"""
+        fd, tmp_path = temp_file_beside(output_docx)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                self.write(md_text, f)
+            os.replace(tmp_path, output_docx)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def watch(converter, input_md, output_docx, interval=0.2, on_update=None, on_error=None):
+    """Re-convert input_md to output_docx whenever it changes, until interrupted
+
+    on_update is called with (seconds, rendered, reused) after each save and
+    on_error with the exception when a conversion fails; watching continues
+    either way.
+    """
+    renderer = IncrementalRenderer(converter, os.path.dirname(os.path.abspath(input_md)))
+    last_mtime = None
+    while True:
+        try:
+            mtime = os.stat(input_md).st_mtime_ns
+        except FileNotFoundError:
+            # Editors may replace the file by deleting and recreating it
+            mtime = None
+        if mtime is not None and mtime != last_mtime:
+            last_mtime = mtime
+            start = time.perf_counter()
+            rendered, reused = renderer.rendered, renderer.reused
+            try:
+                with open(input_md, "r", encoding="utf-8") as f:
+                    md_text = f.read()
+                renderer.save(md_text, output_docx)
+            except Exception as e:
+                if on_error is not None:
+                    on_error(e)
+            else:
+                if on_update is not None:
+                    on_update(time.perf_counter() - start,
+                              renderer.rendered - rendered, renderer.reused - reused)
+        time.sleep(interval)
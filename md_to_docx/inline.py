@@ -0,0 +1,214 @@
+"""
+Inline formatting: text runs, their formats and CSS colour parsing
+
+Engines describe the content of a paragraph, heading, list item or table
+cell as a stream of events, ('start', tag, style, href), ('end', tag),
+('text', text) and ('image', src, alt), and runs_from_events() turns it
+into a list of (text, InlineFormat) runs. Adjacent text with the same
+format is merged into one run, so documents with heavy markup keep their
+run count minimal. Every image is a run of its own.
+"""
+
+import re
+from functools import lru_cache
+from collections import namedtuple
+
+from docx.shared import RGBColor
+
+
+# Formatting of one run; link is the target URL, color an RGBColor or None and
+# image the source of an image, whose run text is its alt text
+InlineFormat = namedtuple('InlineFormat', 'bold italic code link color image')
+
+PLAIN = InlineFormat(False, False, False, None, None, None)
+
+_BOLD_TAGS = frozenset(['strong', 'b'])
+_ITALIC_TAGS = frozenset(['em', 'i'])
+_CODE_TAGS = frozenset(['code', 'kbd', 'samp'])
+
+# CSS named colours
+CSS_COLOR_NAMES = {
+    'aliceblue': 'F0F8FF', 'antiquewhite': 'FAEBD7', 'aqua': '00FFFF', 'aquamarine': '7FFFD4',
+    'azure': 'F0FFFF', 'beige': 'F5F5DC', 'bisque': 'FFE4C4', 'black': '000000',
+    'blanchedalmond': 'FFEBCD', 'blue': '0000FF', 'blueviolet': '8A2BE2', 'brown': 'A52A2A',
+    'burlywood': 'DEB887', 'cadetblue': '5F9EA0', 'chartreuse': '7FFF00', 'chocolate': 'D2691E',
+    'coral': 'FF7F50', 'cornflowerblue': '6495ED', 'cornsilk': 'FFF8DC', 'crimson': 'DC143C',
+    'cyan': '00FFFF', 'darkblue': '00008B', 'darkcyan': '008B8B', 'darkgoldenrod': 'B8860B',
+    'darkgray': 'A9A9A9', 'darkgreen': '006400', 'darkgrey': 'A9A9A9', 'darkkhaki': 'BDB76B',
+    'darkmagenta': '8B008B', 'darkolivegreen': '556B2F', 'darkorange': 'FF8C00',
+    'darkorchid': '9932CC', 'darkred': '8B0000', 'darksalmon': 'E9967A', 'darkseagreen': '8FBC8F',
+    'darkslateblue': '483D8B', 'darkslategray': '2F4F4F', 'darkslategrey': '2F4F4F',
+    'darkturquoise': '00CED1', 'darkviolet': '9400D3', 'deeppink': 'FF1493',
+    'deepskyblue': '00BFFF', 'dimgray': '696969', 'dimgrey': '696969', 'dodgerblue': '1E90FF',
+    'firebrick': 'B22222', 'floralwhite': 'FFFAF0', 'forestgreen': '228B22', 'fuchsia': 'FF00FF',
+    'gainsboro': 'DCDCDC', 'ghostwhite': 'F8F8FF', 'gold': 'FFD700', 'goldenrod': 'DAA520',
+    'gray': '808080', 'green': '008000', 'greenyellow': 'ADFF2F', 'grey': '808080',
+    'honeydew': 'F0FFF0', 'hotpink': 'FF69B4', 'indianred': 'CD5C5C', 'indigo': '4B0082',
+    'ivory': 'FFFFF0', 'khaki': 'F0E68C', 'lavender': 'E6E6FA', 'lavenderblush': 'FFF0F5',
+    'lawngreen': '7CFC00', 'lemonchiffon': 'FFFACD', 'lightblue': 'ADD8E6', 'lightcoral': 'F08080',
+    'lightcyan': 'E0FFFF', 'lightgoldenrodyellow': 'FAFAD2', 'lightgray': 'D3D3D3',
+    'lightgreen': '90EE90', 'lightgrey': 'D3D3D3', 'lightpink': 'FFB6C1', 'lightsalmon': 'FFA07A',
+    'lightseagreen': '20B2AA', 'lightskyblue': '87CEFA', 'lightslategray': '778899',
+    'lightslategrey': '778899', 'lightsteelblue': 'B0C4DE', 'lightyellow': 'FFFFE0',
+    'lime': '00FF00', 'limegreen': '32CD32', 'linen': 'FAF0E6', 'magenta': 'FF00FF',
+    'maroon': '800000', 'mediumaquamarine': '66CDAA', 'mediumblue': '0000CD',
+    'mediumorchid': 'BA55D3', 'mediumpurple': '9370DB', 'mediumseagreen': '3CB371',
+    'mediumslateblue': '7B68EE', 'mediumspringgreen': '00FA9A', 'mediumturquoise': '48D1CC',
+    'mediumvioletred': 'C71585', 'midnightblue': '191970', 'mintcream': 'F5FFFA',
+    'mistyrose': 'FFE4E1', 'moccasin': 'FFE4B5', 'navajowhite': 'FFDEAD', 'navy': '000080',
+    'oldlace': 'FDF5E6', 'olive': '808000', 'olivedrab': '6B8E23', 'orange': 'FFA500',
+    'orangered': 'FF4500', 'orchid': 'DA70D6', 'palegoldenrod': 'EEE8AA', 'palegreen': '98FB98',
+    'paleturquoise': 'AFEEEE', 'palevioletred': 'DB7093', 'papayawhip': 'FFEFD5',
+    'peachpuff': 'FFDAB9', 'peru': 'CD853F', 'pink': 'FFC0CB', 'plum': 'DDA0DD',
+    'powderblue': 'B0E0E6', 'purple': '800080', 'rebeccapurple': '663399', 'red': 'FF0000',
+    'rosybrown': 'BC8F8F', 'royalblue': '4169E1', 'saddlebrown': '8B4513', 'salmon': 'FA8072',
+    'sandybrown': 'F4A460', 'seagreen': '2E8B57', 'seashell': 'FFF5EE', 'sienna': 'A0522D',
+    'silver': 'C0C0C0', 'skyblue': '87CEEB', 'slateblue': '6A5ACD', 'slategray': '708090',
+    'slategrey': '708090', 'snow': 'FFFAFA', 'springgreen': '00FF7F', 'steelblue': '4682B4',
+    'tan': 'D2B48C', 'teal': '008080', 'thistle': 'D8BFD8', 'tomato': 'FF6347',
+    'turquoise': '40E0D0', 'violet': 'EE82EE', 'wheat': 'F5DEB3', 'white': 'FFFFFF',
+    'whitesmoke': 'F5F5F5', 'yellow': 'FFFF00', 'yellowgreen': '9ACD32',
+}
+
+_HEX_RE = re.compile(r'#([0-9a-fA-F]{3,4}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})')
+# rgb()/rgba() with comma or space separated components and an optional alpha
+_RGB_RE = re.compile(
+    r'rgba?\(\s*([\d.]+%?)\s*[,\s]\s*([\d.]+%?)\s*[,\s]\s*([\d.]+%?)\s*(?:[,/]\s*[\d.]+%?\s*)?\)',
+    re.I
+)
+
+
+def _rgb_component(value):
+    """Return a 0-255 channel value from a CSS number or percentage"""
+    if value.endswith('%'):
+        number = float(value[:-1]) * 255 / 100
+    else:
+        number = float(value)
+    return max(0, min(255, int(round(number))))
+
+
+@lru_cache(maxsize=1024)
+def css_color(value):
+    """Return an RGBColor for a CSS colour name, hex or rgb() value, or None"""
+    value = value.strip().lower()
+    if value in CSS_COLOR_NAMES:
+        return RGBColor.from_string(CSS_COLOR_NAMES[value])
+    m = _HEX_RE.fullmatch(value)
+    if m:
+        digits = m.group(1)
+        if len(digits) <= 4:
+            digits = ''.join(ch * 2 for ch in digits)
+        return RGBColor.from_string(digits[:6].upper())
+    m = _RGB_RE.fullmatch(value)
+    if m:
+        try:
+            return RGBColor(*(_rgb_component(group) for group in m.groups()))
+        except ValueError:
+            return None
+    return None
+
+
+@lru_cache(maxsize=1024)
+def style_color(style):
+    """Return the RGBColor of the color declaration in a style attribute, or None"""
+    color = None
+    for declaration in style.split(';'):
+        name, sep, value = declaration.partition(':')
+        if sep and name.strip().lower() == 'color':
+            # Later declarations win, as in CSS
+            color = css_color(value.replace('!important', ''))
+    return color
+
+
+def _child_format(fmt, tag, style, href):
+    """Return the format of content inside a start tag"""
+    if tag in _BOLD_TAGS:
+        fmt = fmt._replace(bold=True)
+    elif tag in _ITALIC_TAGS:
+        fmt = fmt._replace(italic=True)
+    elif tag in _CODE_TAGS:
+        fmt = fmt._replace(code=True)
+    elif tag == 'a' and href:
+        fmt = fmt._replace(link=href)
+    # Any element may also carry a colour, such as <b style="color:red">
+    if style:
+        color = style_color(style)
+        if color is not None:
+            return fmt._replace(color=color)
+    return fmt
+
+
+def runs_from_events(events):
+    """Build coalesced (text, InlineFormat) runs from inline content events
+
+    Unmatched end tags are ignored and an end tag closes any elements left
+    open inside it, the way an HTML parser would recover.
+    """
+    runs = []
+    texts = []
+    current = None
+    stack = [(None, PLAIN)]
+    for event in events:
+        kind = event[0]
+        if kind == 'text':
+            text = event[1]
+            if not text:
+                continue
+            fmt = stack[-1][1]
+            if fmt != current:
+                if texts:
+                    runs.append((''.join(texts), current))
+                    texts = []
+                current = fmt
+            texts.append(text)
+        elif kind == 'image':
+            if texts:
+                runs.append((''.join(texts), current))
+                texts = []
+                current = None
+            runs.append((event[2] or '', stack[-1][1]._replace(image=event[1])))
+        elif kind == 'start':
+            stack.append((event[1], _child_format(stack[-1][1], event[1], event[2], event[3])))
+        else:
+            for pos in range(len(stack) - 1, 0, -1):
+                if stack[pos][0] == event[1]:
+                    del stack[pos:]
+                    break
+    if texts:
+        runs.append((''.join(texts), current))
+    return runs
+
+
+def runs_text(runs):
+    """Return the plain text of a list of runs, with images as their alt text"""
+    return ''.join(text for text, fmt in runs)
+
+
+def _blank(run):
+    """Return whether a run is whitespace only; images never are"""
+    return run[1].image is None and not run[0].strip()
+
+
+def strip_runs(runs):
+    """Return runs without leading and trailing whitespace, dropping emptied runs"""
+    start = 0
+    end = len(runs)
+    while start < end and _blank(runs[start]):
+        start += 1
+    while end > start and _blank(runs[end - 1]):
+        end -= 1
+    if start == end:
+        return []
+    runs = runs[start:end]
+    first_text, first_fmt = runs[0]
+    if first_fmt.image is None:
+        runs[0] = (first_text.lstrip(), first_fmt)
+    last_text, last_fmt = runs[-1]
+    if last_fmt.image is None:
+        runs[-1] = (last_text.rstrip(), last_fmt)
+    return runs
+
+
+def upper_runs(runs):
+    """Return runs with their text in upper case, leaving image alt text alone"""
+    return [(text.upper() if fmt.image is None else text, fmt) for text, fmt in runs]
@@ -0,0 +1,93 @@
+"""
+Writing DOCX packages to files or streams and opening the result
+"""
+
+import os
+import sys
+import zipfile
+import subprocess
+
+from docx.opc.pkgwriter import PackageWriter
+
+from .defaults import STORED
+
+
+# Timestamp of every entry written, the earliest a zip file can record
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def zip_compression(compression=None):
+    """Return (zip compression method, compresslevel) for a compression setting
+
+    compression is None for the default deflate level, STORED for no
+    compression, or a deflate level from 0 to 9.
+    """
+    if compression is None:
+        return zipfile.ZIP_DEFLATED, None
+    if compression == STORED:
+        return zipfile.ZIP_STORED, None
+    if isinstance(compression, int) and not isinstance(compression, bool) and 0 <= compression <= 9:
+        return zipfile.ZIP_DEFLATED, compression
+    raise ValueError(f"Invalid compression {compression!r}, expected '{STORED}' or 0-9")
+
+
+class _ZipPartWriter:
+    """Physical package writer with selectable compression, for PackageWriter's helpers"""
+
+    def __init__(self, output, compression=None):
+        method, level = zip_compression(compression)
+        self._zipf = zipfile.ZipFile(output, 'w', compression=method, compresslevel=level)
+
+    def write(self, pack_uri, blob):
+        # A fixed timestamp keeps output reproducible for the same input
+        info = zipfile.ZipInfo(pack_uri.membername, date_time=ZIP_DATE_TIME)
+        self._zipf.writestr(info, blob, compress_type=self._zipf.compression,
+                            compresslevel=self._zipf.compresslevel)
+
+    def close(self):
+        self._zipf.close()
+
+
+def zip_info(name, compress_type, compresslevel=None):
+    """Return a ZipInfo with the fixed timestamp, for ZipFile.open() in write mode
+
+    ZipFile.open() takes no compression arguments but uses those of the
+    ZipInfo. Python 3.13 made its level public as compress_level; earlier
+    versions, from 3.7, only read the private _compresslevel.
+    """
+    info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+    info.compress_type = compress_type
+    if hasattr(info, 'compress_level'):
+        info.compress_level = compresslevel
+    else:
+        info._compresslevel = compresslevel
+    return info
+
+
+def save_document(doc, output, compression=None):
+    """Save doc as DOCX to a path or writable binary stream
+
+    Parts are compressed and written to output one at a time, so no copy
+    of the whole zip is built in memory. Streams need not be seekable.
+    """
+    package = doc.part.package
+    parts = package.parts
+    for part in parts:
+        part.before_marshal()
+    writer = _ZipPartWriter(output, compression)
+    try:
+        PackageWriter._write_content_types_stream(writer, parts)
+        PackageWriter._write_pkg_rels(writer, package.rels)
+        PackageWriter._write_parts(writer, parts)
+    finally:
+        writer.close()
+
+
+def open_document(path):
+    """Open a file with the platform's default application"""
+    if sys.platform == 'win32':
+        os.startfile(path)
+    elif sys.platform == 'darwin':
+        subprocess.Popen(['open', path])
+    else:
+        subprocess.Popen(['xdg-open', path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -0,0 +1,201 @@
+"""
+Parallel rendering of one large document over a process pool
+
+The Markdown is split into chunks of top-level blocks at the same safe
+boundaries the streaming converter uses. Each chunk is rendered into its own
+document in a worker process and comes back as a body XML fragment together
+with the relationships it references. The fragments are merged in order
+into a single document, which is saved like a serial conversion, so the
+output is byte-identical to Converter.convert() for the same input.
+
+Styles and numbering come from the shared styled template and renderers
+only reference them by ID, so fragments use them unchanged. Relationships
+of a chunk (external links, images) are re-created on the merged document
+in order, images are stored once, and r: attributes and drawing IDs are
+renumbered; see streaming.FragmentMerger.
+
+Reference-style link definitions are collected from the whole input and
+appended to every chunk, so links resolve across chunk boundaries.
+"""
+
+import io
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+from docx.oxml import parse_xml
+
+from .converter import Converter
+from .engines import DEFAULT_ENGINE
+from .profiling import stage
+from .streaming import (
+    FragmentMerger,
+    iter_markdown_chunks,
+    body_xml,
+    fragment_rels,
+    reference_definitions,
+    split_document
+)
+from .utils import iter_fixed_table_lines
+
+
+# Smallest chunk worth shipping to a worker; below this the pickling and
+# merge overhead outweighs the rendering saved
+MIN_CHUNK_CHARS = 64 << 10
+
+# Chunks per worker, so uneven chunks still keep every worker busy
+CHUNKS_PER_WORKER = 4
+
+# Converter owned by each worker process, and the relationship IDs and style
+# count of its empty document
+_worker_converter = None
+_worker_base_rids = None
+_worker_style_count = None
+
+
+def _init_worker(config, engine, template):
+    """Create the per-process converter and warm its template cache"""
+    global _worker_converter, _worker_base_rids, _worker_style_count
+    _worker_converter = Converter(config, engine, template)
+    doc = _worker_converter.new_document()
+    _worker_base_rids = frozenset(doc.part.rels)
+    _worker_style_count = len(doc.styles.element)
+
+
+def _render_chunk(chunk, base_dir=None):
+    """Render one chunk in a worker and return (body XML, referenced relationships, image files)
+
+    The relationships are the fragment_rels() of the chunk's document and
+    the image files are as returned by Converter.render_into().
+    """
+    doc = _worker_converter.new_document()
+    files = _worker_converter.render_into(doc, chunk, base_dir)
+    # Styles live in the template shared by every chunk and are never merged
+    if len(doc.styles.element) != _worker_style_count:
+        raise RuntimeError('rendering a chunk added styles, which parallel rendering cannot merge')
+    fragment = body_xml(doc)
+    return fragment, fragment_rels(doc, fragment, _worker_base_rids), files
+
+
+def merge_fragments(doc, results):
+    """Return doc with rendered (fragment, rels) results as its body, in order
+
+    Each fragment is adapted with a FragmentMerger, then all of them are
+    spliced into the serialized document and parsed once, which is much
+    cheaper than moving their elements one by one.
+    """
+    merger = FragmentMerger(doc)
+    head, tail = split_document(doc)
+    parts = [head]
+    for fragment, rels in results:
+        parts.append(merger.add(fragment, rels))
+    parts.append(tail)
+    part = doc.part
+    part._element = parse_xml(b''.join(parts))
+    return part.document
+
+
+class ParallelConverter:
+    """Convert single documents by rendering their chunks in a process pool"""
+
+    def __init__(self, converter=None, workers=None, chunk_chars=None):
+        if converter is None:
+            converter = Converter()
+        self.converter = converter
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_chars = chunk_chars
+        self._executor = None
+
+    def _pool(self):
+        """Return the worker pool, starting it on first use"""
+        if self._executor is None:
+            converter = self.converter
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(converter.config, converter.engine, converter.template)
+            )
+        return self._executor
+
+    def map(self, fn, *iterables):
+        """Run a module-level function over iterables in the workers, yielding results in order
+
+        fn runs in processes set up by _init_worker(), so it can use their
+        converter.
+        """
+        return self._pool().map(fn, *iterables)
+
+    def render_chunks(self, chunks, base_dir=None):
+        """Render Markdown chunks in the workers and yield their (fragment, rels) in order
+
+        Image files the chunks read are added to the converter's image_files
+        when it collects them.
+        """
+        image_files = self.converter.image_files
+        for fragment, rels, files in self.map(_render_chunk, chunks, itertools.repeat(base_dir)):
+            if image_files is not None:
+                image_files.update(files)
+            yield fragment, rels
+
+    def chunks(self, md_text):
+        """Split Markdown text into the chunks rendered by the workers"""
+        chunk_chars = self.chunk_chars
+        if chunk_chars is None:
+            chunk_chars = max(MIN_CHUNK_CHARS, len(md_text) // (self.workers * CHUNKS_PER_WORKER))
+        lines = list(iter_fixed_table_lines(md_text.split('\n')))
+        chunks = list(iter_markdown_chunks(lines, chunk_chars))
+        if len(chunks) > 1:
+            definitions = reference_definitions(lines)
+            if definitions:
+                suffix = '\n\n' + '\n'.join(definitions)
+                chunks = [chunk + suffix for chunk in chunks]
+        return chunks
+
+    def build_document(self, md_text, base_dir=None):
+        """Convert Markdown text to a python-docx Document
+
+        Relative image paths resolve against base_dir, or the current
+        directory when it is None.
+        """
+        converter = self.converter
+        if converter.profiler is not None:
+            converter.profiler.conversions += 1
+        chunks = self.chunks(md_text)
+        doc = converter.new_document()
+        if len(chunks) <= 1:
+            converter.render_into(doc, md_text, base_dir)
+            return doc
+        with stage(converter.profiler, 'render'):
+            return merge_fragments(doc, self.render_chunks(chunks, base_dir))
+
+    def convert(self, md_text, compression=None, base_dir=None):
+        """Convert Markdown text to DOCX bytes"""
+        buffer = io.BytesIO()
+        self.converter.save(self.build_document(md_text, base_dir), buffer, compression)
+        return buffer.getvalue()
+
+    def convert_file(self, input_md, output_docx, compression=None):
+        """Convert a Markdown file and save the result to a path or binary stream"""
+        with stage(self.converter.profiler, 'read'):
+            with open(input_md, "r", encoding="utf-8") as f:
+                md_content = f.read()
+        base_dir = os.path.dirname(os.path.abspath(input_md))
+        self.converter.save(self.build_document(md_content, base_dir), output_docx, compression)
+
+    def close(self):
+        """Shut down the worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def convert_parallel(md_text, config=None, engine=DEFAULT_ENGINE, template=None, workers=None,
+                     compression=None):
+    """Convert Markdown text to DOCX bytes, rendering its chunks in parallel"""
+    with ParallelConverter(Converter(config, engine, template), workers) as parallel:
+        return parallel.convert(md_text, compression)
@@ -0,0 +1,131 @@
+"""
+Fast path for very large pipe tables in streaming conversions
+
+A pipe table is a single Markdown block, so the chunked streaming converter
+would otherwise parse and render it whole: its HTML or tree, its block rows
+and its python-docx table all held in memory at once. Instead,
+streaming.iter_markdown_chunks() recognizes a pipe table from its header
+and separator lines and, once it has more than a threshold of rows, hands
+it over as a PipeTable whose rows are read from the input on demand.
+
+The converter renders such a table in batches of rows. Each batch is parsed
+as a small table with the same header and separator, so cells get exactly
+the inline formatting, escaping and column count of the whole table, and
+its w:tr rows are appended to the output and dropped before the next batch
+is read. Memory is bounded by the batch size and time is linear in the
+number of rows.
+"""
+
+import re
+
+from markdown import util
+
+from .streaming import _FENCE_RE
+
+
+# Table rows parsed and rendered at a time
+ROW_BATCH = 1000
+
+# Raw HTML starting a line: a comment or the name of a tag
+_HTML_START_RE = re.compile(r'^<(!--|[a-zA-Z][a-zA-Z0-9-]*)')
+
+
+class PipeTableFinder:
+    """Recognize pipe tables with at least min_rows body rows for iter_markdown_chunks()
+
+    md is the Markdown instance of the converter, whose table block
+    processor decides what a table is.
+    """
+
+    def __init__(self, md, min_rows):
+        self.md = md
+        self.min_rows = min_rows
+
+    def _normalize(self, line):
+        """Return a line as the Markdown whitespace preprocessor leaves it"""
+        return line.replace(util.STX, '').replace(util.ETX, '').expandtabs(self.md.tab_length)
+
+    def match(self, header, separator):
+        """Return the column count of a table starting with the header and separator lines, or None"""
+        processor = self.md.parser.blockprocessors['table']
+        if not processor.test(None, self._normalize(header) + '\n' + self._normalize(separator)):
+            return None
+        return len(processor.separator)
+
+    def ends_table(self, line):
+        """Return True for a line that Markdown takes out of a table block before parsing it
+
+        Fenced code and block-level raw HTML are extracted by preprocessors,
+        so such a line directly after the rows starts a new block rather
+        than another row. A fence that is never closed is not extracted and
+        would stay a row, but it still ends a streamed table, as the
+        chunker reads such a fence as code to the end of the input.
+        """
+        if _FENCE_RE.match(line):
+            return True
+        m = _HTML_START_RE.match(line)
+        return m is not None and (m.group(1) == '!--' or self.md.is_block_level(m.group(1).lower()))
+
+    def table(self, header, separator, columns, rows, lines):
+        """Return the PipeTable of a recognized table, see PipeTable"""
+        return PipeTable(header, separator, columns, rows, lines, self.ends_table)
+
+
+class PipeTable:
+    """A large pipe table found in a line stream, whose rows are read on demand
+
+    rows are the body rows read while recognizing the table; the remaining
+    ones are read from lines, up to the blank line ending the table or a line
+    for which ends_table() is true. Such a line is kept as next_line, for
+    the caller to read before the rest of lines.
+    """
+
+    def __init__(self, header, separator, columns, rows, lines, ends_table):
+        self.header = header
+        self.separator = separator
+        self.columns = columns
+        self.next_line = None
+        self._rows = rows
+        self._lines = lines
+        self._ends_table = ends_table
+        self._done = False
+
+    def _iter_rows(self):
+        """Yield the body row lines, consuming them from the input"""
+        rows, self._rows = self._rows, []
+        yield from rows
+        if self._done:
+            return
+        for line in self._lines:
+            line = line.rstrip('\r\n')
+            if not line.strip():
+                break
+            if self._ends_table(line):
+                self.next_line = line
+                break
+            yield line
+        self._done = True
+
+    def batches(self, size=ROW_BATCH):
+        """Yield (first_row, markdown) for batches of at most size body rows
+
+        Each markdown is the header, separator and batch rows, a table of its
+        own; first_row is the index of its first body row in the whole table,
+        counting the header as row 0.
+        """
+        prefix = self.header + '\n' + self.separator + '\n'
+        first_row = 1
+        batch = []
+        for line in self._iter_rows():
+            batch.append(line)
+            if len(batch) == size:
+                yield first_row, prefix + '\n'.join(batch)
+                first_row += size
+                batch = []
+        if batch:
+            yield first_row, prefix + '\n'.join(batch)
+
+    def drain(self):
+        """Consume the rows that were not read, leaving the input after the table"""
+        for _ in self._iter_rows():
+            pass
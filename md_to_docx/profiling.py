@@ -0,0 +1,96 @@
+"""
+Opt-in per-stage and per-element profiling of conversions
+"""
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+
+# Shared no-op context used for stages when profiling is off
+NULL_STAGE = nullcontext()
+
+
+def stage(profiler, name):
+    """Return profiler.stage(name), or a no-op context when profiler is None"""
+    if profiler is None:
+        return NULL_STAGE
+    return profiler.stage(name)
+
+
+class Profiler:
+    """Collect wall time, memory peaks and element counts across conversions
+
+    Stages are pipeline steps such as 'preprocess', 'markdown',
+    'html_parse', 'template', 'render' and 'save'. Each records how often
+    it ran, its cumulative wall time and, when trace_memory is set, the
+    highest tracemalloc peak seen while it ran. Stages may nest, and an
+    outer stage's peak includes those of the stages inside it. Elements
+    are counted and timed per block tag (p, h1-h6, pre, ul, ol, table) in
+    the render loop.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.elements = {}
+        self.conversions = 0
+        self._started_tracemalloc = False
+        # Peaks of the open stages, innermost last, up to the latest reset_peak()
+        self._peaks = []
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as the named stage"""
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            # Resetting the peak for this stage would lose the enclosing one's
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._peaks.append(0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            record = self.stages.get(name)
+            if record is None:
+                record = self.stages[name] = {'calls': 0, 'seconds': 0.0, 'peak_bytes': 0}
+            record['calls'] += 1
+            record['seconds'] += elapsed
+            if self.trace_memory:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                record['peak_bytes'] = max(record['peak_bytes'], peak)
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+
+    def record_element(self, tag, seconds):
+        """Add one rendered element of the given tag"""
+        record = self.elements.get(tag)
+        if record is None:
+            record = self.elements[tag] = {'count': 0, 'seconds': 0.0}
+        record['count'] += 1
+        record['seconds'] += seconds
+
+    def stop(self):
+        """Stop tracemalloc if this profiler started it"""
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def to_dict(self):
+        """Return the collected measurements as a JSON-serializable dict"""
+        return {
+            'conversions': self.conversions,
+            'trace_memory': self.trace_memory,
+            'stages': self.stages,
+            'elements': self.elements,
+        }
+
+    def to_json(self, **kwargs):
+        """Return the collected measurements as a JSON string"""
+        return json.dumps(self.to_dict(), **kwargs)
@@ -0,0 +1,210 @@
+"""
+Rendering of document blocks into a Word document
+
+Blocks are produced by the parsing engines in md_to_docx.engines as
+(tag, payload) tuples, where tag is the HTML tag name the block corresponds
+to and payload is:
+
+- p, h1-h6: a list of (text, InlineFormat) runs, see md_to_docx.inline
+- pre: (code text, language or None)
+- ul, ol: a list of items, each a list of runs
+- table: a list of rows, each a list of (cell_tag, runs) cells
+
+Renderers take an optional images.ImageLoader that embeds image runs; without
+one images are written as their alt text.
+"""
+
+from docx.shared import Pt
+
+from .formatters import set_cell_border, add_bulk_table, append_bulk_rows, add_runs, add_styled_runs
+from .highlight import highlight_runs
+from .inline import strip_runs, upper_runs
+from .formatters.styles import (
+    BODY_STYLE_ID,
+    CODE_STYLE_ID,
+    CODE_TABLE_STYLE_ID,
+    LIST_BULLET_STYLE_ID,
+    LIST_NUMBER_STYLE_ID,
+    TABLE_HEADER_STYLE_ID,
+    TABLE_DATA_STYLE_ID,
+    heading_style_id
+)
+
+
+def _image_xml(images):
+    """Return the image_xml callable for runs_xml(), or None without a loader"""
+    return images.xml if images is not None else None
+
+
+def render_paragraph(doc, tag, runs, config, images=None):
+    """Add a body paragraph"""
+    paragraph = doc.add_paragraph()
+    paragraph._p.style = BODY_STYLE_ID
+    add_runs(paragraph, runs, image_xml=_image_xml(images))
+
+
+def render_heading(doc, tag, runs, config, images=None):
+    """Add a heading with configured formatting"""
+    # Configured headings have a compiled style
+    if tag in config.headings:
+        paragraph = doc.add_paragraph()
+        paragraph._p.style = heading_style_id(tag)
+    else:
+        # Fall back to the built-in heading style, which apply_config_styles()
+        # adds to templates that lack it
+        level = int(tag[1])
+        paragraph = doc.add_heading(level=level)
+    add_runs(paragraph, runs, image_xml=_image_xml(images))
+
+
+def render_codeblock(doc, tag, code, config, images=None):
+    """Add a code block as a one-cell table using the code block table style"""
+    code_text, language = code
+    code_text = code_text.strip()
+
+    # Create a table with one cell for the code block
+    table = doc.add_table(rows=1, cols=1)
+    table._tbl.tblStyle_val = CODE_TABLE_STYLE_ID
+    cell = table.cell(0, 0)
+
+    # Add code text in the monospace code style, highlighted if configured
+    paragraph = cell.paragraphs[0]
+    paragraph._p.style = CODE_STYLE_ID
+    runs = highlight_runs(code_text, language, config.codeblock)
+    if runs is None:
+        paragraph.add_run(code_text)
+    else:
+        add_styled_runs(paragraph, runs)
+
+    # Add empty paragraph after table for spacing
+    doc.add_paragraph()
+
+
+def render_list(doc, tag, items, config, images=None):
+    """Add the items of an ordered or unordered list"""
+    style_id = LIST_NUMBER_STYLE_ID if tag == "ol" else LIST_BULLET_STYLE_ID
+    image_xml = _image_xml(images)
+    for runs in items:
+        paragraph = doc.add_paragraph()
+        paragraph._p.style = style_id
+        add_runs(paragraph, runs, image_xml=image_xml)
+
+
+def _cell_runs(row_idx, cell_tag, runs, uppercase):
+    """Return (is_header, runs) for a table cell with edges stripped"""
+    runs = strip_runs(runs)
+    if row_idx == 0 or cell_tag == "th":
+        return True, upper_runs(runs) if uppercase else runs
+    return False, runs
+
+
+def _bulk_rows(rows, uppercase, start=0):
+    """Convert table rows, the first being row start, into the (is_header, runs) matrix used by add_bulk_table"""
+    return [
+        [_cell_runs(row_idx, cell_tag, runs, uppercase) for cell_tag, runs in cells]
+        for row_idx, cells in enumerate(rows, start)
+    ]
+
+
+def render_table(doc, tag, rows, config, images=None):
+    """Add a table with header and data row formatting"""
+    table_config = config.table
+    image_xml = _image_xml(images)
+
+    if not rows:
+        return
+
+    # Count maximum columns
+    max_cols = 0
+    for cells in rows:
+        max_cols = max(max_cols, len(cells))
+
+    if max_cols == 0:
+        return
+
+    # Large tables are built in one pass with borders from a shared table style
+    if len(rows) >= table_config.bulk_threshold:
+        add_bulk_table(doc, _bulk_rows(rows, table_config.uppercase), max_cols,
+                       table_config.vertical_alignment, image_xml, config.codeblock.font.name)
+        doc.add_paragraph()
+        return
+
+    # Create Word table
+    table = doc.add_table(rows=len(rows), cols=max_cols)
+
+    # Process each row
+    for row_idx, cells in enumerate(rows):
+        for col_idx, (cell_tag, runs) in enumerate(cells):
+            if col_idx < max_cols:
+                word_cell = table.cell(row_idx, col_idx)
+
+                # Clear paragraph and set up formatting
+                paragraph = word_cell.paragraphs[0]
+                paragraph.clear()
+
+                # Set 0pt spacing after paragraph
+                paragraph.paragraph_format.space_after = Pt(0)
+
+                # Handle header row (first row or th elements), uppercased if configured
+                is_header, runs = _cell_runs(row_idx, cell_tag, runs, table_config.uppercase)
+                if is_header:
+                    # Header formatting from the compiled character style
+                    add_runs(paragraph, runs, TABLE_HEADER_STYLE_ID, image_xml, config.codeblock.font.name)
+
+                    # Set vertical alignment for header cells
+                    word_cell.vertical_alignment = table_config.vertical_alignment_enum
+
+                    # Header row borders: no borders except bottom
+                    set_cell_border(word_cell, {
+                        'top': False,
+                        'left': False,
+                        'bottom': True,
+                        'right': False
+                    })
+                else:
+                    # Data row formatting, keeping inline formatting and span colors
+                    add_runs(paragraph, runs, TABLE_DATA_STYLE_ID, image_xml)
+
+                    # Data row borders: top, left, right, bottom for data rows
+                    borders = {
+                        'top': row_idx == 1,  # Only first data row gets top border
+                        'left': True,
+                        'bottom': True,
+                        'right': True
+                    }
+                    set_cell_border(word_cell, borders)
+
+    # Add empty paragraph after table for spacing
+    doc.add_paragraph()
+
+
+def render_table_rows(tbl, rows, start, config, images=None):
+    """Append a batch of table rows to a table from formatters.start_bulk_table()
+
+    rows are (cell_tag, runs) cells as in a table block and start is the
+    index of the first row in the whole table, so tables can be rendered
+    in batches with the same result as in one bulk table.
+    """
+    append_bulk_rows(tbl, _bulk_rows(rows, config.table.uppercase, start), _image_xml(images),
+                     config.codeblock.font.name)
+
+
+BLOCK_RENDERERS = {
+    'p': render_paragraph,
+    'h1': render_heading,
+    'h2': render_heading,
+    'h3': render_heading,
+    'h4': render_heading,
+    'h5': render_heading,
+    'h6': render_heading,
+    'pre': render_codeblock,
+    'ul': render_list,
+    'ol': render_list,
+    'table': render_table,
+}
+
+
+def render_block(doc, block, config, images=None):
+    """Render one (tag, payload) block into the document"""
+    tag, payload = block
+    BLOCK_RENDERERS[tag](doc, tag, payload, config, images)
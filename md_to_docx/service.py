@@ -0,0 +1,319 @@
+"""
+Localhost HTTP conversion service backed by a pre-warmed worker pool
+
+POST /convert with a Markdown body (any content type other than JSON)
+returns the DOCX bytes. A JSON body of the form
+{"markdown": "...", "config": {...}} applies config overrides on top of the
+service's base config for that request. GET /metrics returns Prometheus
+text with request counts, a conversion latency histogram and queue depth;
+GET /health returns 200 once the workers are warm.
+
+Requests beyond the workers plus the bounded queue are rejected with 503
+instead of piling up. Bodies need a Content-Length of at most
+MAX_BODY_BYTES. Images are only read from the files below the configured
+image root, against which relative paths resolve; without one, requests
+cannot embed local files at all.
+"""
+
+import os
+import copy
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .config import ConfigError, compile_config, load_compiled_config
+from .converter import Converter
+from .engines import DEFAULT_ENGINE
+from .defaults import DEFAULT_PORT, DEFAULT_QUEUE_SIZE
+
+
+MAX_BODY_BYTES = 64 << 20
+LOCALHOST = '127.0.0.1'
+
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+# Upper bounds in seconds of the conversion latency histogram
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Converters owned by each worker process, keyed by their config overrides
+_worker_base = None
+_worker_converters = OrderedDict()
+_WORKER_CONVERTERS_SIZE = 8
+
+# Number of distinct override sets remembered as valid by the front end
+_VALIDATED_SIZE = 256
+
+
+def merge_config(base, overrides):
+    """Return a copy of base with the nested overrides dict applied on top"""
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def _init_worker(config, engine, template, image_root):
+    """Create the worker's base converter and warm its template cache"""
+    global _worker_base
+    _worker_base = Converter(config, engine, template)
+    _worker_base.image_root = image_root or False
+    _worker_base.new_document()
+
+
+def _worker_ready():
+    """Return once the worker process has run its initializer"""
+    return os.getpid()
+
+
+def _worker_converter(overrides_key):
+    """Return the worker's converter for a JSON-encoded overrides dict"""
+    if overrides_key is None:
+        return _worker_base
+    converter = _worker_converters.get(overrides_key)
+    if converter is None:
+        config = merge_config(_worker_base.config, json.loads(overrides_key))
+        converter = Converter(config, _worker_base.engine, _worker_base.template)
+        converter.image_root = _worker_base.image_root
+        _worker_converters[overrides_key] = converter
+        if len(_worker_converters) > _WORKER_CONVERTERS_SIZE:
+            _worker_converters.popitem(last=False)
+    else:
+        _worker_converters.move_to_end(overrides_key)
+    return converter
+
+
+def _convert_text(md_text, overrides_key):
+    """Convert Markdown text to DOCX bytes inside a worker"""
+    converter = _worker_converter(overrides_key)
+    # Relative image paths resolve against the image root, if any
+    return converter.convert(md_text, base_dir=converter.image_root or None)
+
+
+class Metrics:
+    """Thread-safe request counters, latency histogram and in-flight gauge"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.latency_count = 0
+        self.latency_sum = 0.0
+        self.in_flight = 0
+
+    def count(self, status):
+        """Count a finished request by HTTP status"""
+        with self._lock:
+            self.requests[status] = self.requests.get(status, 0) + 1
+
+    def observe(self, seconds):
+        """Record one conversion latency, from admission to result"""
+        with self._lock:
+            self.latency_count += 1
+            self.latency_sum += seconds
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    self.bucket_counts[i] += 1
+                    break
+
+    def adjust(self, delta):
+        """Change the number of admitted, unfinished conversions"""
+        with self._lock:
+            self.in_flight += delta
+
+    def render(self, workers, capacity):
+        """Return the metrics in Prometheus text exposition format"""
+        with self._lock:
+            lines = ['# TYPE md_to_docx_requests_total counter']
+            for status, count in sorted(self.requests.items()):
+                lines.append(f'md_to_docx_requests_total{{status="{status}"}} {count}')
+            lines.append('# TYPE md_to_docx_conversion_seconds histogram')
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, self.bucket_counts):
+                cumulative += count
+                lines.append(f'md_to_docx_conversion_seconds_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'md_to_docx_conversion_seconds_bucket{{le="+Inf"}} {self.latency_count}')
+            lines.append(f'md_to_docx_conversion_seconds_sum {self.latency_sum}')
+            lines.append(f'md_to_docx_conversion_seconds_count {self.latency_count}')
+            lines.append('# TYPE md_to_docx_in_flight gauge')
+            lines.append(f'md_to_docx_in_flight {self.in_flight}')
+            # Conversions beyond one per worker are waiting in the queue
+            lines.append('# TYPE md_to_docx_queue_depth gauge')
+            lines.append(f'md_to_docx_queue_depth {max(0, self.in_flight - workers)}')
+            lines.append('# TYPE md_to_docx_workers gauge')
+            lines.append(f'md_to_docx_workers {workers}')
+            lines.append('# TYPE md_to_docx_capacity gauge')
+            lines.append(f'md_to_docx_capacity {capacity}')
+            return '\n'.join(lines) + '\n'
+
+
+class ConversionService:
+    """Worker pool, admission control and metrics shared by request handlers"""
+
+    def __init__(self, workers=None, queue_size=DEFAULT_QUEUE_SIZE, config=None,
+                 engine=DEFAULT_ENGINE, template=None, image_root=None):
+        # Fail fast on a bad base config instead of in every worker
+        if config is None:
+            self.base_config = load_compiled_config().raw
+        else:
+            self.base_config = compile_config(config).raw
+        self.workers = workers or os.cpu_count() or 1
+        self.capacity = self.workers + queue_size
+        self.metrics = Metrics()
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(config, engine, template, image_root))
+        self._validated = OrderedDict()
+        self._validated_lock = threading.Lock()
+
+    def warm(self):
+        """Start every worker process and wait until each has run its initializer"""
+        futures = [self._executor.submit(_worker_ready) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def overrides_key(self, overrides):
+        """Validate config overrides and return their canonical JSON key, or None"""
+        if not overrides:
+            return None
+        if not isinstance(overrides, dict):
+            raise ConfigError("config overrides must be an object")
+        key = json.dumps(overrides, sort_keys=True)
+        with self._validated_lock:
+            if key in self._validated:
+                return key
+        compile_config(merge_config(self.base_config, overrides))
+        with self._validated_lock:
+            self._validated[key] = True
+            if len(self._validated) > _VALIDATED_SIZE:
+                self._validated.popitem(last=False)
+        return key
+
+    def try_acquire(self):
+        """Reserve a worker or queue slot, returning False when the service is full"""
+        if not self._slots.acquire(blocking=False):
+            return False
+        self.metrics.adjust(1)
+        return True
+
+    def convert(self, md_text, overrides_key):
+        """Convert in a worker; the caller must hold a slot from try_acquire()"""
+        start = time.perf_counter()
+        try:
+            data = self._executor.submit(_convert_text, md_text, overrides_key).result()
+        finally:
+            self.metrics.adjust(-1)
+            self._slots.release()
+        self.metrics.observe(time.perf_counter() - start)
+        return data
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        self._executor.shutdown(cancel_futures=True)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """HTTP front end for a ConversionService set on the server"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        """Keep request logging quiet; /metrics covers traffic"""
+
+    def _reply(self, status, body, content_type='text/plain; charset=utf-8', headers=None):
+        """Send a complete response and count it"""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.service.metrics.count(status)
+
+    def do_GET(self):
+        service = self.server.service
+        path = self.path.split('?', 1)[0]
+        if path == '/metrics':
+            self._reply(200, service.metrics.render(service.workers, service.capacity),
+                        'text/plain; version=0.0.4')
+        elif path == '/health':
+            self._reply(200, 'ok\n')
+        else:
+            self._reply(404, 'Not found\n')
+
+    def do_POST(self):
+        service = self.server.service
+        if self.path.split('?', 1)[0] != '/convert':
+            self._reply(404, 'Not found\n')
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length'))
+        except (TypeError, ValueError):
+            length = -1
+        if length < 0:
+            # The body cannot be skipped without a valid length
+            self.close_connection = True
+            self._reply(400, 'Bad request: missing or invalid Content-Length\n')
+            return
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._reply(413, f'Request body exceeds {MAX_BODY_BYTES} bytes\n')
+            return
+        body = self.rfile.read(length)
+
+        try:
+            if self.headers.get_content_type() == 'application/json':
+                request = json.loads(body)
+                if not isinstance(request, dict) or not isinstance(request.get('markdown'), str):
+                    raise ValueError('expected an object with a "markdown" string')
+                md_text = request['markdown']
+                overrides_key = service.overrides_key(request.get('config'))
+            else:
+                md_text = body.decode('utf-8')
+                overrides_key = None
+        except ConfigError as e:
+            self._reply(400, f'{e}\n')
+            return
+        except ValueError as e:
+            self._reply(400, f'Bad request: {e}\n')
+            return
+
+        if not service.try_acquire():
+            self._reply(503, 'Conversion queue is full\n', headers={'Retry-After': '1'})
+            return
+        try:
+            data = service.convert(md_text, overrides_key)
+        except Exception as e:
+            self._reply(500, f'Conversion failed: {type(e).__name__}: {e}\n')
+            return
+        self._reply(200, data, DOCX_CONTENT_TYPE)
+
+
+def serve(port=DEFAULT_PORT, workers=None, queue_size=DEFAULT_QUEUE_SIZE, config=None,
+          engine=DEFAULT_ENGINE, template=None, ready=None, image_root=None):
+    """Run the conversion service on localhost until interrupted
+
+    ready, if given, is called with the bound (host, port) once the workers
+    are warm and the server accepts requests. image_root is the directory
+    requests may read images from; None allows no local images.
+    """
+    service = ConversionService(workers, queue_size, config, engine, template, image_root)
+    try:
+        service.warm()
+        with ThreadingHTTPServer((LOCALHOST, port), ServiceHandler) as server:
+            server.daemon_threads = True
+            server.service = service
+            if ready is not None:
+                ready(server.server_address)
+            server.serve_forever()
+    finally:
+        service.shutdown()
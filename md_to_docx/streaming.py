@@ -0,0 +1,480 @@
+"""
+Streaming, bounded-memory conversion of very large Markdown inputs
+
+The input is read line by line and split into chunks at blank lines that
+are safe block boundaries: never inside a fenced code block or a raw HTML
+block, between the rows of a table, inside an indented continuation or
+between the items of a list. Each chunk is rendered into its own
+short-lived document and its body XML is appended to word/document.xml,
+which is written incrementally inside the output zip. Peak memory is
+bounded by the chunk size or the largest single block, whichever is bigger.
+
+Pipe tables with very many rows are not chunked but handed over as a
+pipetable.PipeTable, whose rows the converter reads and renders in batches.
+
+Reference-style link definitions are collected by reference_definitions()
+in a first pass over a file and appended to every chunk, so links resolve
+across chunks; streams that cannot be read twice only resolve them within
+a chunk.
+"""
+
+import io
+import os
+import re
+import hashlib
+import zipfile
+
+from lxml import etree
+from markdown.util import BLOCK_LEVEL_ELEMENTS
+from docx.opc.part import Part
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+
+from .defaults import DEFAULT_CHUNK_CHARS
+from .images import get_or_add_image_part
+from .output import STORED, save_document, zip_info
+from .utils import is_table_line, temp_file_beside
+
+_FENCE_RE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+_LIST_ITEM_RE = re.compile(r'^ {0,3}(?:[*+-]|\d+[.)])\s')
+_REFERENCE_RE = re.compile(r'^ {0,3}\[([^\[\]]+)\]:(.*)$')
+_TITLE_LINE_RE = re.compile(r'^\s+["\'(]')
+# A comment or tag starting a line, which may start a raw HTML block
+_HTML_BLOCK_RE = re.compile(r'^ {0,3}<(!--|[a-zA-Z][a-zA-Z0-9-]*)')
+# Block-level tags that start raw HTML blocks, which void elements never do
+_HTML_BLOCK_TAGS = frozenset(BLOCK_LEVEL_ELEMENTS) - {'hr'}
+
+# Inputs larger than this get zip64 headers for document.xml up front, since
+# its final size is unknown while streaming and may exceed 4 GB
+ZIP64_INPUT_SIZE = 256 << 20
+
+
+def iter_markdown_chunks(lines, chunk_chars=DEFAULT_CHUNK_CHARS, tables=None):
+    """Group an iterable of lines into Markdown chunks split at safe block boundaries
+
+    Lines may keep their line endings (as read from a file) or not; chunks
+    are returned as strings with normalized '\\n' line endings.
+
+    tables is an optional pipetable.PipeTableFinder. Pipe tables starting a
+    block with at least its min_rows body rows are then yielded as
+    pipetable.PipeTable items in place of chunks; their rows are read from
+    lines as the PipeTable is consumed.
+    """
+    lines = iter(lines)
+    # Lines to read again before the rest, such as the one ending a PipeTable
+    pushed = []
+    chunk = []
+    size = 0
+    fence = None
+    last_kind = None
+    split_pending = False
+    # Index in chunk of the header of a table that may take the fast path
+    table_start = None
+    columns = None
+    prev_blank = True
+    # Tag of the open raw HTML block, '!--' for a comment, and its nesting depth
+    html = None
+    html_depth = 0
+
+    for line in _iter_lines(lines, pushed):
+        line = line.rstrip('\r\n')
+        stripped = line.strip()
+
+        if fence is not None:
+            # Inside a fenced code block, only the matching fence closes it
+            m = _FENCE_RE.match(line)
+            if m and m.group(1)[0] == fence[0] and len(m.group(1)) >= len(fence) \
+                    and not line[m.end():].strip():
+                fence = None
+        elif html is not None:
+            # Markdown keeps a raw HTML block whole, blank lines included,
+            # until its outermost tag is closed
+            html_depth += _html_depth(line, html)
+            if html_depth <= 0:
+                html = None
+        elif not stripped:
+            if size >= chunk_chars:
+                split_pending = True
+        else:
+            if split_pending:
+                split_pending = False
+                continues = (
+                    line[:1] in (' ', '\t')
+                    or (last_kind == 'table' and is_table_line(stripped))
+                    or (last_kind == 'list' and _LIST_ITEM_RE.match(line))
+                )
+                if not continues:
+                    yield '\n'.join(chunk)
+                    chunk = []
+                    size = 0
+
+            m = _FENCE_RE.match(line)
+            html_m = _HTML_BLOCK_RE.match(line)
+            if m:
+                fence = m.group(1)
+                last_kind = 'fence'
+            elif html_m and (html_m.group(1) == '!--' or html_m.group(1).lower() in _HTML_BLOCK_TAGS):
+                tag = html_m.group(1).lower()
+                html_depth = _html_depth(line, tag)
+                if html_depth > 0:
+                    html = tag
+                last_kind = 'html'
+            elif is_table_line(stripped):
+                last_kind = 'table'
+            elif _LIST_ITEM_RE.match(line):
+                last_kind = 'list'
+            elif line[:1] not in (' ', '\t'):
+                last_kind = 'text'
+
+        chunk.append(line)
+        size += len(line) + 1
+
+        if tables is not None:
+            if fence is not None or html is not None or not stripped:
+                table_start = None
+            elif table_start is None:
+                # A table is recognized from the first two lines of a block
+                if prev_blank and last_kind == 'table' and line[:1] not in (' ', '\t'):
+                    table_start = len(chunk) - 1
+            elif len(chunk) - table_start == 2:
+                columns = tables.match(chunk[table_start], line)
+                if columns is None:
+                    table_start = None
+            elif tables.ends_table(line):
+                # Left to Markdown, which takes the line out of the table
+                table_start = None
+            elif len(chunk) - table_start - 2 >= tables.min_rows:
+                header, separator = chunk[table_start:table_start + 2]
+                rows = chunk[table_start + 2:]
+                del chunk[table_start:]
+                if any(chunk_line.strip() for chunk_line in chunk):
+                    yield '\n'.join(chunk)
+                table = tables.table(header, separator, columns, rows, lines)
+                yield table
+                # The table ends at a blank line, which the PipeTable consumed,
+                # or at a line starting another block, which is read next
+                table.drain()
+                if table.next_line is not None:
+                    pushed.append(table.next_line)
+                chunk = []
+                size = 0
+                last_kind = None
+                table_start = None
+                stripped = table.next_line or ''
+            prev_blank = not stripped
+
+    if chunk:
+        yield '\n'.join(chunk)
+
+
+def _html_depth(line, tag):
+    """Return how many more tag elements, or comments for '!--', a line opens than it closes"""
+    if tag == '!--':
+        return line.count('<!--') - line.count('-->')
+    opened = len(re.findall(rf'<{tag}(?=[\s/>]|$)', line, re.I))
+    closed = len(re.findall(rf'</{tag}\s*>', line, re.I))
+    return opened - closed
+
+
+def _iter_lines(lines, pushed):
+    """Yield the lines of an iterator, each time first those pushed back onto the pushed list"""
+    while True:
+        while pushed:
+            yield pushed.pop()
+        line = next(lines, None)
+        if line is None:
+            return
+        yield line
+
+
+def reference_definitions(lines):
+    """Return the reference-style link definition lines outside fenced code"""
+    definitions = []
+    fence = None
+    continued = False
+    for line in lines:
+        m = _FENCE_RE.match(line)
+        if fence is not None:
+            if m and m.group(1)[0] == fence[0] and len(m.group(1)) >= len(fence) \
+                    and not line[m.end():].strip():
+                fence = None
+            continue
+        if m:
+            fence = m.group(1)
+            continued = False
+            continue
+        # The URL or title of a definition may be on the following line
+        if continued and (_TITLE_LINE_RE.match(line) or not definitions[-1].split(':', 1)[1].strip()):
+            definitions.append(line)
+            continued = False
+            continue
+        m = _REFERENCE_RE.match(line)
+        continued = m is not None
+        if m:
+            definitions.append(line)
+    return definitions
+
+
+def body_xml(doc):
+    """Serialize the body content of doc without its w:body wrapper or sectPr"""
+    body = doc.element.body
+    sectPr = body.sectPr
+    if sectPr is not None:
+        body.remove(sectPr)
+    xml = etree.tostring(body, encoding='UTF-8')
+    if sectPr is not None:
+        body.append(sectPr)
+    if xml.endswith(b'/>'):
+        return b''
+    # The start tag only carries namespace declarations, which never contain '>'
+    return xml[xml.index(b'>') + 1:xml.rindex(b'</')]
+
+
+def split_document(doc):
+    """Serialize doc, whose body must be empty, into the XML before and after its body content
+
+    Body content placed between the two parts goes before the sectPr.
+    """
+    body = doc.element.body
+    if len(body) > (1 if body.sectPr is not None else 0):
+        raise ValueError('base document body must be empty')
+
+    # Split the serialized document element at the start of its body,
+    # leaving the sectPr and closing tags for the tail
+    document = etree.tostring(doc.element, encoding='UTF-8', standalone=True)
+    body_start = document.index(b'<w:body')
+    body_open_end = document.index(b'>', body_start) + 1
+    if document[body_open_end - 2:body_open_end] == b'/>':
+        return document[:body_open_end - 2] + b'>', b'</w:body>' + document[body_open_end:]
+    return document[:body_open_end], document[body_open_end:]
+
+
+# Tags with relationship ID attributes (r:id, r:embed, ...) in serialized body
+# XML; serialized text and attribute values never contain a raw '<' or '>', so
+# text that merely looks like such an attribute is never matched
+_RID_TAG_RE = re.compile(rb'<[^<>]*\sr:[A-Za-z]+="rId\d+"[^<>]*>')
+# Relationship ID attributes within one of those tags
+_RID_ATTR_RE = re.compile(rb'(\sr:[A-Za-z]+=")(rId\d+)(")')
+# Drawing object IDs, which must be unique within a document
+_DOCPR_RE = re.compile(rb'<wp:docPr id="\d+" name="Picture \d+"')
+
+
+def _iter_rids(fragment):
+    """Yield the relationship IDs referenced by the tags of a body fragment, in order"""
+    for tag in _RID_TAG_RE.finditer(fragment):
+        for m in _RID_ATTR_RE.finditer(tag.group(0)):
+            yield m.group(2).decode('ascii')
+
+
+def fragment_rels(doc, fragment, base_rids):
+    """Return the relationships of doc that a body fragment references beyond base_rids
+
+    Each is (rId, reltype, is_external, target_ref, content_type, blob),
+    where target_ref is the partname of internal targets and content_type
+    and blob are None for external ones. The tuples are plain data, so they
+    can be pickled or cached along with the fragment.
+    """
+    rels = []
+    seen = set(base_rids)
+    for rId in _iter_rids(fragment):
+        if rId in seen:
+            continue
+        seen.add(rId)
+        rel = doc.part.rels[rId]
+        if rel.is_external:
+            rels.append((rId, rel.reltype, True, rel.target_ref, None, None))
+        else:
+            part = rel.target_part
+            rels.append((rId, rel.reltype, False, str(part.partname), part.content_type, part.blob))
+    return rels
+
+
+def _partname_template(partname):
+    """Return a next_partname() template for partnames like partname"""
+    return re.sub(r'\d*(\.[^./]*)?$', lambda m: '%d' + (m.group(1) or ''), partname, count=1)
+
+
+class FragmentMerger:
+    """Adapt body fragments rendered in other documents to one target document
+
+    Relationships a fragment references are re-created on the target in
+    order, with identical images stored once, and its r: attributes are
+    renumbered to match. Drawing IDs are renumbered sequentially, so the
+    result equals rendering everything into the target directly.
+    """
+
+    def __init__(self, doc):
+        self.part = doc.part
+        self._image_parts = {}
+        self._other_parts = {}
+        self._next_id = None
+
+    def _target(self, reltype, target_ref, content_type, blob):
+        """Return the target's part for an internal relationship, adding it once"""
+        package = self.part.package
+        if reltype == RT.IMAGE:
+            ext = target_ref.rpartition('.')[2]
+            return get_or_add_image_part(package, hashlib.sha1(blob).hexdigest(), blob,
+                                         content_type, ext, self._image_parts)
+        part = self._other_parts.get((content_type, blob))
+        if part is None:
+            partname = package.next_partname(_partname_template(target_ref))
+            part = Part(partname, content_type, blob, package)
+            self._other_parts[(content_type, blob)] = part
+        return part
+
+    def _renumber_drawing(self, m):
+        shape_id = self._next_id
+        self._next_id += 1
+        return b'<wp:docPr id="%d" name="Picture %d"' % (shape_id, shape_id)
+
+    def add(self, fragment, rels):
+        """Return fragment adapted to the target, relating everything it references"""
+        part = self.part
+        mapping = {}
+        for rId, reltype, is_external, target_ref, content_type, blob in rels:
+            if is_external:
+                new_rId = part.relate_to(target_ref, reltype, is_external=True)
+            else:
+                new_rId = part.relate_to(self._target(reltype, target_ref, content_type, blob), reltype)
+            if new_rId != rId:
+                mapping[rId.encode('ascii')] = new_rId.encode('ascii')
+        if mapping:
+            def renumber(m):
+                return m.group(1) + mapping.get(m.group(2), m.group(2)) + m.group(3)
+            fragment = _RID_TAG_RE.sub(lambda tag: _RID_ATTR_RE.sub(renumber, tag.group(0)), fragment)
+        if b'<wp:docPr ' in fragment:
+            if self._next_id is None:
+                self._next_id = part.next_id
+            fragment = _DOCPR_RE.sub(self._renumber_drawing, fragment)
+        return fragment
+
+
+class _CutOffOutput:
+    """File object a zip is written through, whose writes cut_off() discards
+
+    Closing a ZipFile always writes its central directory, which would
+    make an abandoned archive look complete. Seeking and telling are passed
+    on, and fail the same way, so ZipFile treats it as it would the output.
+    """
+
+    def __init__(self, output):
+        self._output = output
+        self._cut_off = False
+
+    def cut_off(self):
+        """Discard every later write"""
+        self._cut_off = True
+
+    def write(self, data):
+        if self._cut_off:
+            return len(data)
+        return self._output.write(data)
+
+    def flush(self):
+        if not self._cut_off:
+            self._output.flush()
+
+    def tell(self):
+        return self._output.tell()
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._output.seek(offset, whence)
+
+
+class StreamingDocxWriter:
+    """Write a DOCX package whose document body is appended incrementally
+
+    base_doc supplies every part except the main document body: its styles,
+    numbering, settings and section properties are written unchanged and the
+    body content passed to write() is placed before its sectPr. The document
+    part is written first and the other parts on close(), so images and
+    other parts the fragments reference are included.
+
+    A path output is written to a temporary file that replaces it on
+    close(), so a failed conversion never leaves a truncated document
+    there. Leaving a with block by an exception calls abort() instead of
+    close().
+    """
+
+    def __init__(self, base_doc, output, compression=zipfile.ZIP_DEFLATED, large=False,
+                 compresslevel=None):
+        self._base_doc = base_doc
+        self._merger = FragmentMerger(base_doc)
+        self._document_name = base_doc.part.partname.lstrip('/')
+        self._head, self._tail = split_document(base_doc)
+
+        self._path = None
+        self._file = None
+        if isinstance(output, (str, os.PathLike)):
+            fd, self._tmp_path = temp_file_beside(output)
+            self._path = output
+            self._file = output = os.fdopen(fd, 'wb')
+
+        self._output = _CutOffOutput(output)
+        self._zip = zipfile.ZipFile(self._output, 'w', compression=compression,
+                                    compresslevel=compresslevel)
+        info = zip_info(self._document_name, compression, compresslevel)
+        self._stream = self._zip.open(info, 'w', force_zip64=large)
+        self._stream.write(self._head)
+
+    def write(self, xml, rels=()):
+        """Append serialized body content to word/document.xml
+
+        rels are the fragment_rels() of the document xml was rendered in.
+        """
+        if rels or b'<wp:docPr ' in xml:
+            xml = self._merger.add(xml, rels)
+        self._stream.write(xml)
+
+    def close(self):
+        """Finish document.xml, write the other parts and close the zip"""
+        if self._stream is None:
+            return
+        self._stream.write(self._tail)
+        self._stream.close()
+        self._stream = None
+
+        package = io.BytesIO()
+        # Stored entries: the base package is only read back, never kept
+        save_document(self._base_doc, package, STORED)
+        with zipfile.ZipFile(package) as base:
+            for item in base.infolist():
+                if item.filename != self._document_name:
+                    self._zip.writestr(item, base.read(item), compress_type=self._zip.compression,
+                                       compresslevel=self._zip.compresslevel)
+        self._zip.close()
+        if self._file is not None:
+            self._file.close()
+            os.replace(self._tmp_path, self._path)
+            self._file = None
+
+    def abort(self):
+        """Stop writing without finishing the package
+
+        A path output is left as it was. A stream output has received an
+        incomplete zip without a central directory, which no reader accepts
+        as a document.
+        """
+        if self._stream is None:
+            return
+        stream, self._stream = self._stream, None
+        # The output itself may be what failed; nothing else is written to it
+        self._output.cut_off()
+        for close in (stream.close, self._zip.close):
+            try:
+                close()
+            except Exception:
+                pass
+        if self._file is not None:
+            self._file.close()
+            os.remove(self._tmp_path)
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
@@ -0,0 +1,110 @@
+"""
+Cached document templates and cheap per-conversion clones
+"""
+
+import os
+import copy
+from collections import OrderedDict
+
+from docx import Document
+from docx.parts.document import DocumentPart
+from docx.parts.numbering import NumberingPart
+from docx.parts.settings import SettingsPart
+from docx.opc.parts.coreprops import CorePropertiesPart
+
+from .formatters import apply_config_styles, ensure_table_style
+
+
+# Parts a conversion may modify; every other part is shared between clones
+_COPIED_PARTS = (DocumentPart, NumberingPart, SettingsPart, CorePropertiesPart)
+
+# Parsed templates keyed by (path, mtime)
+_template_cache = {}
+
+# Templates with config styles applied, keyed by (template key, id(config))
+_styled_cache = OrderedDict()
+_STYLED_CACHE_SIZE = 8
+
+
+def _template_key(path):
+    """Return the cache key for a template path, or None for the default template"""
+    if path is None:
+        return None
+    path = os.path.abspath(path)
+    return (path, os.stat(path).st_mtime_ns)
+
+
+def _clear_body(doc):
+    """Remove the content of a reference document, keeping its section settings"""
+    body = doc.element.body
+    sectPr = body.sectPr
+    for child in list(body):
+        if child is not sectPr:
+            body.remove(child)
+
+
+def load_template(path=None):
+    """Return the parsed template Document, cached per path and mtime
+
+    path is a reference .docx whose styles, page setup, headers and footers
+    are reused; its body content is dropped. None uses python-docx's default
+    template. The returned Document is shared and must not be modified;
+    use clone_document() to get a private copy.
+    """
+    key = _template_key(path)
+    doc = _template_cache.get(key)
+    if doc is None:
+        doc = Document(path)
+        if path is not None:
+            _clear_body(doc)
+            # Only the current version of each file is kept
+            for stale in [k for k in _template_cache if k is not None and k[0] == key[0]]:
+                del _template_cache[stale]
+        _template_cache[key] = doc
+    return doc
+
+
+def clone_document(doc, share_styles=True):
+    """Return a copy of doc that can be filled without affecting the original
+
+    Only the parts a conversion modifies (document body, numbering, settings
+    and core properties) are deep-copied; the others, including the large
+    styles part when share_styles is true, are shared copy-on-write style.
+    Pass share_styles=False before adding or changing styles on the clone.
+    """
+    memo = {}
+    styles_part = doc.part._styles_part
+    for part in doc.part.package.iter_parts():
+        if isinstance(part, _COPIED_PARTS):
+            continue
+        if part is styles_part and not share_styles:
+            continue
+        memo[id(part)] = part
+    return copy.deepcopy(doc, memo)
+
+
+def styled_template(config, path=None):
+    """Return the shared template for path with the config styles applied
+
+    Results are cached per template and compiled config object, so repeated
+    conversions only pay for clone_document().
+    """
+    key = (_template_key(path), id(config))
+    entry = _styled_cache.get(key)
+    if entry is not None and entry[0] is config:
+        _styled_cache.move_to_end(key)
+        return entry[1]
+
+    doc = clone_document(load_template(path), share_styles=False)
+    if path is None:
+        # Set default font to Calibri; reference templates keep their own
+        doc.styles['Normal'].font.name = 'Calibri'
+    apply_config_styles(doc, config)
+    # Added up front rather than by the first bulk table, since clones share
+    # the styles part and rendered chunks must not need style changes
+    ensure_table_style(doc, config.table.vertical_alignment)
+    # Keep config referenced so its id cannot be reused while cached
+    _styled_cache[key] = (config, doc)
+    if len(_styled_cache) > _STYLED_CACHE_SIZE:
+        _styled_cache.popitem(last=False)
+    return doc
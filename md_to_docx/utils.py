@@ -2,37 +2,83 @@
 Utility functions for Markdown preprocessing
 """
 
-import re
+import os
+import tempfile
 
 
-def fix_markdown_tables(content):
-    """Remove blank lines between table rows to ensure proper parsing"""
-    # This function processes markdown content to fix tables that have blank lines
-    # between rows, which can break markdown table parsing
-    
-    lines = content.split('\n')
-    result = []
+def is_table_line(line):
+    """Return True for lines treated as table rows: two or more pipes"""
+    return line.count('|') >= 2
+
+
+def iter_fixed_table_lines(lines):
+    """Yield lines with the blank lines between table rows removed
+
+    lines is any iterable of strings, such as a list or a text file object;
+    line endings are passed through unchanged. Blank lines are held back only
+    while they follow a table row, so memory stays bounded by the longest run
+    of blank lines.
+    """
+    pending = []
     in_table = False
-    
-    for i, line in enumerate(lines):
-        stripped = line.strip()
-        
-        # Detect table start (line with pipes)
-        if '|' in stripped and stripped.count('|') >= 2:
-            # Check if this is a separator line (---)
-            is_separator = bool(re.match(r'^[\s\-:|]+$', stripped.replace('|', '')))
-            
-            # Check if previous line was also table content
-            if i > 0 and in_table and not result[-1].strip():
-                # Remove blank line before table row
-                result.pop()
-            
+
+    for line in lines:
+        if line.count('|') >= 2:
+            # Blank lines separating table rows are dropped
+            if pending:
+                pending.clear()
             in_table = True
-            result.append(line)
+            yield line
+        elif line.strip():
+            if pending:
+                yield from pending
+                pending.clear()
+            in_table = False
+            yield line
+        elif in_table:
+            pending.append(line)
         else:
-            # Not a table line
-            if stripped:  # Non-empty line
-                in_table = False
-            result.append(line)
-    
-    return '\n'.join(result)
+            yield line
+
+    yield from pending
+
+
+def fix_markdown_tables(content):
+    """Remove blank lines between table rows to ensure proper parsing"""
+    return '\n'.join(iter_fixed_table_lines(content.split('\n')))
+
+
+# Process umask, read once since reading it means setting it
+_umask = None
+
+
+def temp_file_beside(path):
+    """Create a temporary file in the directory of path and return (fd, tmp_path)
+
+    The file gets the permissions a newly created file would get instead of
+    mkstemp()'s owner-only ones, so it can be moved to path with os.replace().
+    """
+    global _umask
+    if _umask is None:
+        _umask = os.umask(0o022)
+        os.umask(_umask)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.', suffix='.tmp', dir=directory)
+    os.chmod(tmp_path, 0o666 & ~_umask)
+    return fd, tmp_path
+
+
+def atomic_write_bytes(path, data):
+    """Write data to path atomically via a temporary file in the same directory"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp_path = temp_file_beside(path)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise